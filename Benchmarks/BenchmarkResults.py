@@ -0,0 +1,148 @@
+##!/usr/bin/env python
+"""
+Benchmark Results: Stores the timings of a benchmark run as a json file and compares them against a saved baseline
+so that a slower stage is flagged as a regression.
+
+Results are saved in the format {"benchmark": STR, "created": STR, "python": STR, "results": {CASE: {STAGE: SECONDS}}}
+"""
+
+#imports
+import json
+import platform
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+__author__ = "Dylan Smith"
+__copyright__ = "Copyright (C) 2018 Dylan Smith"
+__credits__ = ["Dylan Smith"]
+
+__license__ = "Personal Use"
+__version__ = "1.0"
+__maintainer__ = "Dylan Smith"
+__email__ = "-"
+__status__ = "Development"
+
+class BenchmarkResults(object):
+    #constants
+    bench_dir = Path(__file__).resolve().parent
+    results_dir = bench_dir.joinpath('Results')
+    baseline_dir = bench_dir.joinpath('Baselines')
+
+    def __init__(self, benchmark_name, tolerance = 0.25, min_seconds = 0.05):
+        """
+        Instantiates the results for one benchmark run.
+
+        ::param benchmark_name: The name of the benchmark, used for the results and baseline file names
+        ::param tolerance: The fraction that a stage can be slower than the baseline before it is a regression
+        ::param min_seconds: Differences smaller than this are treated as noise and never flagged
+        """
+        self.benchmark_name = benchmark_name
+        self.tolerance = tolerance
+        self.min_seconds = min_seconds
+        self.results = {}
+
+    @contextmanager
+    def timeStage(self, case, stage):
+        """
+        Time the body of a with statement and add the elapsed seconds to the stage for the case
+
+        ::param case: The benchmark case, for example the number of tweets
+        ::param stage: The name of the stage being timed
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.addTiming(case, stage, time.perf_counter() - start)
+
+    def wrapStage(self, case, stage, func):
+        """
+        Wrap a function so that every call to it is added to the timing of the stage
+
+        ::param case: The benchmark case, for example the number of tweets
+        ::param stage: The name of the stage being timed
+        ::param func: The function to time
+        returns - the wrapped function
+        """
+        def timed(*args, **kwargs):
+            with self.timeStage(case, stage):
+                return func(*args, **kwargs)
+        return timed
+
+    def addTiming(self, case, stage, seconds):
+        """
+        ::param case: The benchmark case, for example the number of tweets
+        ::param stage: The name of the stage being timed
+        ::param seconds: The seconds to add to the stage
+        """
+        case_results = self.results.setdefault(str(case), {})
+        case_results[stage] = case_results.get(stage, 0.0) + seconds
+
+    def saveResults(self, as_baseline = False):
+        """
+        Write the results of the run to the results folder, and optionally make them the new baseline
+
+        ::param as_baseline: Whether the results should also replace the saved baseline
+        returns - the path of the results file
+        """
+        payload = {'benchmark': self.benchmark_name,
+                   'created': datetime.now().isoformat(timespec = 'seconds'),
+                   'python': platform.python_version(),
+                   'results': self.results}
+        self.results_dir.mkdir(parents = True, exist_ok = True)
+        results_file = self.results_dir.joinpath('%s_%s.json' % (self.benchmark_name, datetime.now().strftime('%Y%m%d%H%M%S')))
+        with open(results_file, 'w') as fp:
+            json.dump(payload, fp, indent = 2)
+        if as_baseline:
+            self.baseline_dir.mkdir(parents = True, exist_ok = True)
+            with open(self.baseline_dir.joinpath(self.benchmark_name + '.json'), 'w') as fp:
+                json.dump(payload, fp, indent = 2)
+        return results_file
+
+    def compareToBaseline(self):
+        """
+        Compare the results of the run against the saved baseline.  Only the cases and stages that exist in both
+        are compared.
+
+        returns - a list of (case, stage, baseline seconds, current seconds) for each regression, or None when
+                  there is no baseline saved for the benchmark
+        """
+        baseline_file = self.baseline_dir.joinpath(self.benchmark_name + '.json')
+        if not baseline_file.exists():
+            return None
+        with open(baseline_file, 'r') as fp:
+            baseline = json.load(fp)['results']
+
+        regressions = []
+        for case, stages in self.results.items():
+            for stage, seconds in stages.items():
+                base_seconds = baseline.get(case, {}).get(stage)
+                if base_seconds is None:
+                    continue
+                if seconds > base_seconds * (1 + self.tolerance) and seconds - base_seconds > self.min_seconds:
+                    regressions.append((case, stage, base_seconds, seconds))
+        return regressions
+
+    def reportResults(self, as_baseline = False):
+        """
+        Save the results, print them next to the baseline and report any regressions
+
+        ::param as_baseline: Whether the results should also replace the saved baseline
+        returns - True when no regressions were found
+        """
+        results_file = self.saveResults(as_baseline)
+        print('Results written to %s' % results_file)
+        for case, stages in self.results.items():
+            for stage, seconds in stages.items():
+                print('%12s %-28s %10.4fs' % (case, stage, seconds))
+
+        regressions = [] if as_baseline else self.compareToBaseline()
+        if regressions is None:
+            print('No baseline saved for %s.  Re-run with --save-baseline to create one' % self.benchmark_name)
+            return True
+        for case, stage, base_seconds, seconds in regressions:
+            print('REGRESSION %s %s: %.4fs -> %.4fs (%+.0f%%)' % (case, stage, base_seconds, seconds,
+                                                                100 * (seconds / base_seconds - 1)))
+        return not regressions
@@ -0,0 +1,91 @@
+##!/usr/bin/env python
+"""
+CLI Startup Benchmark: Measures the cold start time of each TwitterAnalysisTool subcommand.  Every measurement is
+taken in a fresh python process so that nothing is already imported.  The stages that are timed are
+    - import: the seconds to import TwitterAnalysisTool and the data module that the subcommand loads
+    - wall: the seconds for the whole process to run, measured from outside the process
+
+download, cleanse, score and compact need credentials or raw data and serve does not exit, so only their imports
+are run.  status and export are run end to end against a small synthetic project.
+
+sample statement to run >>python3 -m Benchmarks.CLIStartupBenchmark --repeat 5
+"""
+
+#imports
+import argparse
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from Benchmarks.BenchmarkResults import BenchmarkResults
+from Benchmarks.SyntheticTweetGenerator import SyntheticTweetGenerator
+
+__author__ = "Dylan Smith"
+__copyright__ = "Copyright (C) 2018 Dylan Smith"
+__credits__ = ["Dylan Smith"]
+
+__license__ = "Personal Use"
+__version__ = "1.0"
+__maintainer__ = "Dylan Smith"
+__email__ = "-"
+__status__ = "Development"
+
+#the module that each subcommand imports when it runs
+stage_imports = {'download': 'PythonDataModules.TwitterScraper',
+                 'cleanse': 'PythonDataModules.TwitterCleanser',
+                 'score': 'PythonDataModules.TwitterSentimentAnalyzer',
+                 'compact': 'PythonDataModules.TwitterDataCompactor',
+                 'export': None,
+                 'status': None,
+                 'serve': 'PythonDataModules.TwitterSentimentQuery'}
+repo_dir = Path(__file__).resolve().parent.parent
+import_script = """import time
+start = time.perf_counter()
+import TwitterAnalysisTool
+if %r is not None:
+    __import__(%r)
+print(time.perf_counter() - start)"""
+
+def timeProcess(cmd):
+    """
+    Run a command from the root of the repository and time it
+
+    ::param cmd: The command to run as a list
+    returns - A tuple of (wall seconds, the standard output of the process)
+    """
+    start = time.perf_counter()
+    completed = subprocess.run(cmd, cwd = str(repo_dir), stdout = subprocess.PIPE, stderr = subprocess.PIPE,
+                               universal_newlines = True)
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError('%s failed:\n%s' % (' '.join(cmd), completed.stderr))
+    return elapsed, completed.stdout
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Time the cold start of each TwitterAnalysisTool subcommand')
+    parser.add_argument('--repeat', type = int, default = 5, help = 'the number of runs; the median is kept')
+    parser.add_argument('--save-baseline', action = 'store_true', help = 'save this run as the new baseline')
+    args = parser.parse_args(argv)
+
+    results = BenchmarkResults('CLIStartupBenchmark', min_seconds = 0.02)
+    work_dir = Path(tempfile.mkdtemp(prefix = 'twtr_cli_bench_'))
+    try:
+        generator = SyntheticTweetGenerator()
+        generator.createProject(work_dir, 'BenchmarkArea', 'Benchmark', generator.default_groups)
+        for stage, module in stage_imports.items():
+            import_times = [float(timeProcess([sys.executable, '-c', import_script % (module, module)])[1])
+                            for _ in range(args.repeat)]
+            results.addTiming(stage, 'import', statistics.median(import_times))
+            if module is None:
+                cmd = [sys.executable, 'TwitterAnalysisTool.py', '--root', str(work_dir), 'BenchmarkArea', 'Benchmark', stage]
+                wall_times = [timeProcess(cmd)[0] for _ in range(args.repeat)]
+                results.addTiming(stage, 'wall', statistics.median(wall_times))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors = True)
+    return 0 if results.reportResults(args.save_baseline) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+##!/usr/bin/env python
+"""
+Pipeline Benchmark: Times every stage of the cleanse and sentiment process on synthetic tweet files of increasing
+size.  The stages that are timed are
+    - compact (--compact): TwitterDataCompactor merging the daily files into monthly archives before the load
+    - ingest: TwitterCleanser.uploadTweetsIntoCleanser
+    - reply_resolution: joining the replies to the text of the original tweets
+    - retweet_counting: summing the retweets onto the original tweets
+    - sentiment_scoring: the vaderSentiment calls made by the TwitterSentimentAnalyzer
+    - sentiment_total: TwitterSentimentAnalyzer.calculateSentimentForTweets, including the daily aggregation
+
+The results are written to Benchmarks/Results and compared against Benchmarks/Baselines/PipelineBenchmark.json
+
+sample statement to run >>python3 -m Benchmarks.PipelineBenchmark --sizes 10000 100000 1000000
+"""
+
+#imports
+import argparse
+import logging
+import shutil
+import sqlite3 as db
+import sys
+import tempfile
+from pathlib import Path
+from Benchmarks.BenchmarkResults import BenchmarkResults
+from Benchmarks.SyntheticTweetGenerator import SyntheticTweetGenerator
+from PythonDataModules.TwitterDataCompactor import TwitterDataCompactor
+from PythonDataModules.TwitterCleanser import TwitterCleanser
+from PythonDataModules.TwitterSentimentAnalyzer import TwitterSentimentAnalyzer
+
+__author__ = "Dylan Smith"
+__copyright__ = "Copyright (C) 2018 Dylan Smith"
+__credits__ = ["Dylan Smith"]
+
+__license__ = "Personal Use"
+__version__ = "1.0"
+__maintainer__ = "Dylan Smith"
+__email__ = "-"
+__status__ = "Development"
+
+def runPipelineBenchmark(results, total_tweets, groups, days, work_dir, compact = False):
+    """
+    Generate a synthetic project and time each stage of the pipeline on it
+
+    ::param results: The BenchmarkResults object that collects the timings
+    ::param total_tweets: The number of raw records to generate for the case
+    ::param groups: The list of group names for the synthetic project
+    ::param days: The number of days that the tweets span
+    ::param work_dir: The directory that the synthetic project is created in
+    ::param compact(Optional): compact the raw files into archives before the load, so that the load reads the archives
+    """
+    case = str(total_tweets) + ('_compacted' if compact else '')
+    generator = SyntheticTweetGenerator()
+    proj_data_dir, proj_analysis_dir = generator.createProject(work_dir, 'BenchmarkArea', 'Benchmark', groups)
+    with results.timeStage(case, 'generate'):
+        counts = generator.writeRawTweets(proj_data_dir, groups, total_tweets, days = days)
+    logging.info('-- Generated %s for %s tweets --' % (counts, case))
+    if compact:
+        with results.timeStage(case, 'compact'):
+            TwitterDataCompactor(proj_data_dir, raw_retention_days = 0).compactAllGroups()
+
+    connection = db.connect(str(proj_analysis_dir.joinpath('CleansedData.db')))
+    twitter_cleanser = TwitterCleanser(proj_data_dir = proj_data_dir, db_connection = connection, load_type = 'FULL')
+    twitter_cleanser.joinRepliedTweetsForGroup = results.wrapStage(case, 'reply_resolution',
+                                                                   twitter_cleanser.joinRepliedTweetsForGroup)
+    twitter_cleanser.addRetweetCountsForGroup = results.wrapStage(case, 'retweet_counting',
+                                                                  twitter_cleanser.addRetweetCountsForGroup)
+    with results.timeStage(case, 'ingest'):
+        twitter_cleanser.uploadTweetsIntoCleanser()
+    twitter_cleanser.cleanseRepliedTweets()
+
+    twitter_sentiment = TwitterSentimentAnalyzer(proj_data_dir = proj_data_dir,
+                                                 proj_analysis_dir = proj_analysis_dir,
+                                                 db_connection = connection,
+                                                 days_to_update = twitter_cleanser.getDaysToUpdate())
+    twitter_sentiment.returnSentimentForTweet = results.wrapStage(case, 'sentiment_scoring',
+                                                                  twitter_sentiment.returnSentimentForTweet)
+    with results.timeStage(case, 'sentiment_total'):
+        twitter_sentiment.calculateSentimentForTweets()
+    connection.close()
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Time the twitter cleanse and sentiment stages on synthetic data')
+    parser.add_argument('--sizes', nargs = '+', type = int, default = [10000, 100000, 1000000],
+                        help = 'the total number of tweets to generate for each case')
+    parser.add_argument('--groups', type = int, default = 8, help = 'the number of groups in the project')
+    parser.add_argument('--days', type = int, default = 7, help = 'the number of days that the tweets span')
+    parser.add_argument('--work-dir', type = Path, default = None,
+                        help = 'where the synthetic projects are written.  Defaults to a temporary directory')
+    parser.add_argument('--compact', action = 'store_true',
+                        help = 'also run every size with the raw files compacted into monthly archives')
+    parser.add_argument('--save-baseline', action = 'store_true', help = 'save this run as the new baseline')
+    args = parser.parse_args(argv)
+
+    groups = SyntheticTweetGenerator.default_groups[:args.groups]
+    results = BenchmarkResults('PipelineBenchmark')
+    for total_tweets in args.sizes:
+        for compact in ([False, True] if args.compact else [False]):
+            work_dir = Path(tempfile.mkdtemp(prefix = 'twtr_bench_', dir = args.work_dir))
+            try:
+                runPipelineBenchmark(results, total_tweets, groups, args.days, work_dir, compact)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors = True)
+    return 0 if results.reportResults(args.save_baseline) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,188 @@
+##!/usr/bin/env python
+"""
+Query Latency Benchmark: Measures the latency of TwitterSentimentQuery.getSentiment under concurrent readers, with
+and without the result cache, optionally while a writer keeps loading tweets into the same database.  The stages
+that are recorded for each case are
+    - p50 / p95: the median and 95th percentile latency of a single query
+    - wall: the seconds for all readers to finish their queries
+
+sample statement to run >>python3 -m Benchmarks.QueryLatencyBenchmark --tweets 1000000 --readers 8 --with-writer
+"""
+
+#imports
+import argparse
+import random
+import shutil
+import sqlite3 as db
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from Benchmarks.BenchmarkResults import BenchmarkResults
+from Benchmarks.SyntheticTweetGenerator import SyntheticTweetGenerator
+from PythonDataModules.SentimentAggregates import SentimentAggregates
+from PythonDataModules.TweetStore import TweetStore
+from PythonDataModules.TwitterSentimentQuery import TwitterSentimentQuery
+
+__author__ = "Dylan Smith"
+__copyright__ = "Copyright (C) 2018 Dylan Smith"
+__credits__ = ["Dylan Smith"]
+
+__license__ = "Personal Use"
+__version__ = "1.0"
+__maintainer__ = "Dylan Smith"
+__email__ = "-"
+__status__ = "Development"
+
+def returnDays(days):
+    """
+    ::param days: the number of days to return, ending on a fixed day for reproducibility
+    returns - a list of (day, day_key) in the formats of the day and day_key columns
+    """
+    end_date = date(2018, 10, 14)
+    all_days = [end_date - timedelta(days = n) for n in range(days - 1, -1, -1)]
+    return [(d.strftime('%b%d%Y'), int(d.strftime('%Y%m%d'))) for d in all_days]
+
+def loadScoredTweets(tweet_store, groups, days, tweets_per_day, first_id, rand):
+    """
+    Write scored tweets straight into the Tweets table and replace the hourly sentiment of the days they were written
+    on, which is what the queries read
+
+    ::param tweet_store: the TweetStore of the database
+    ::param groups: the groups to write tweets for
+    ::param days: a list of (day, day_key) to write tweets on
+    ::param tweets_per_day: the number of tweets for each group and day
+    ::param first_id: the id of the first tweet
+    ::param rand: the random number generator
+    returns - the id after the last tweet written
+    """
+    tweet_id = first_id
+    sentiment_aggregates = SentimentAggregates(tweet_store.connection)
+    for group in groups:
+        for day, day_key in days:
+            rows = []
+            for _ in range(tweets_per_day):
+                rows.append((day_key, tweet_id, 'fan', 'Wed Oct 10 12:00:00 -0500 2018', day, 'game day', 0, 0,
+                             rand.uniform(-1, 1)))
+                tweet_id += 1
+            tweet_store.writeTweets(group, rows)
+            sentiment_aggregates.replaceDay(group, day_key)
+    tweet_store.connection.commit()
+    return tweet_id
+
+def returnQueryPool(groups, days, distinct_queries, seed):
+    """
+    Build the set of queries that the readers pick from.  Dashboards ask the same handful of questions over and over,
+    so the readers draw from a fixed pool rather than sending a new query every time.
+
+    ::param groups: the groups that can be asked for
+    ::param days: the list of (day, day_key) that ranges are picked from
+    ::param distinct_queries: the number of distinct queries in the pool
+    ::param seed: the seed for the pool
+    returns - a list of (groups, start day_key, end day_key, granularity)
+    """
+    rand = random.Random(seed)
+    pool = []
+    for _ in range(distinct_queries):
+        start, end = sorted(rand.sample(range(len(days)), 2))
+        query_groups = rand.sample(groups, rand.randint(1, min(4, len(groups))))
+        pool.append((query_groups, days[start][1], days[end][1], rand.choice(TwitterSentimentQuery.granularities)))
+    return pool
+
+def runReaders(sentiment_query, query_pool, readers, queries_per_reader, seed):
+    """
+    Run concurrent readers that each send random queries from the pool
+
+    ::param sentiment_query: the TwitterSentimentQuery that is shared by the readers
+    ::param query_pool: the list of queries that the readers pick from
+    ::param readers: the number of reader threads
+    ::param queries_per_reader: the number of queries that each reader sends
+    ::param seed: the seed for the picks.  The same seed sends the same queries
+    returns - a tuple of (list of latencies, wall seconds)
+    """
+    latencies, latency_lock = [], threading.Lock()
+
+    def reader(reader_num):
+        rand = random.Random(seed + reader_num)
+        reader_latencies = []
+        for _ in range(queries_per_reader):
+            query = rand.choice(query_pool)
+            query_start = time.perf_counter()
+            sentiment_query.getSentiment(*query)
+            reader_latencies.append(time.perf_counter() - query_start)
+        with latency_lock:
+            latencies.extend(reader_latencies)
+
+    threads = [threading.Thread(target = reader, args = (n,)) for n in range(readers)]
+    wall_start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, time.perf_counter() - wall_start
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Time sentiment queries under concurrent readers')
+    parser.add_argument('--tweets', type = int, default = 1000000, help = 'the number of tweets in the database')
+    parser.add_argument('--groups', type = int, default = 8, help = 'the number of groups in the database')
+    parser.add_argument('--days', type = int, default = 60, help = 'the number of days the tweets span')
+    parser.add_argument('--readers', type = int, default = 8, help = 'the number of concurrent reader threads')
+    parser.add_argument('--queries', type = int, default = 200, help = 'the number of queries sent by each reader')
+    parser.add_argument('--distinct-queries', type = int, default = 50,
+                        help = 'the number of distinct queries that the readers pick from')
+    parser.add_argument('--with-writer', action = 'store_true',
+                        help = 'keep loading tweets and recording loads while the readers run')
+    parser.add_argument('--save-baseline', action = 'store_true', help = 'save this run as the new baseline')
+    args = parser.parse_args(argv)
+
+    groups = SyntheticTweetGenerator.default_groups[:args.groups]
+    days = returnDays(args.days)
+    results = BenchmarkResults('QueryLatencyBenchmark', min_seconds = 0.001)
+    work_dir = Path(tempfile.mkdtemp(prefix = 'twtr_query_bench_'))
+    try:
+        db_path = work_dir.joinpath('CleansedData.db')
+        connection = db.connect(str(db_path))
+        tweet_store = TweetStore(connection, groups)
+        tweet_store.createTweetTables()
+        SentimentAggregates(connection).createAggregateTables()
+        rand = random.Random(2018)
+        next_id = loadScoredTweets(tweet_store, groups, days, max(1, args.tweets // (len(groups) * len(days))), 1, rand)
+        tweet_store.recordLoadCompletion('benchmark')
+
+        stop_writer = threading.Event()
+        def writer():
+            #a writer with its own connection, like the nightly job, that records a load after every batch
+            writer_store = TweetStore(db.connect(str(db_path)), groups)
+            writer_id = next_id
+            while not stop_writer.is_set():
+                writer_id = loadScoredTweets(writer_store, groups[:1], days[-1:], 500, writer_id, random.Random(writer_id))
+                writer_store.recordLoadCompletion('benchmark')
+                time.sleep(0.5)
+            writer_store.connection.close()
+
+        writer_thread = threading.Thread(target = writer)
+        if args.with_writer:
+            writer_thread.start()
+        try:
+            query_pool = returnQueryPool(groups, days, args.distinct_queries, 2018)
+            for case, cache_size in [('uncached', 0), ('cached', 256)]:
+                sentiment_query = TwitterSentimentQuery(db_path, cache_size = cache_size)
+                latencies, wall = runReaders(sentiment_query, query_pool, args.readers, args.queries, 2018)
+                latencies.sort()
+                results.addTiming(case, 'p50', statistics.median(latencies))
+                results.addTiming(case, 'p95', latencies[int(0.95 * (len(latencies) - 1))])
+                results.addTiming(case, 'wall', wall)
+        finally:
+            stop_writer.set()
+            if args.with_writer:
+                writer_thread.join()
+        connection.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors = True)
+    return 0 if results.reportResults(args.save_baseline) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,153 @@
+##!/usr/bin/env python
+"""
+Sentiment Price Benchmark: Measures SentimentPriceAnalytics for a universe of symbols and groups.  The stages that
+are timed are
+    - align: reading the hourly sentiment and the prices of every symbol and lining them up on the trading days
+    - correlations: the lagged correlations of every (group, symbol, lag)
+    - rolling_betas: the rolling betas of every (group, symbol, lag)
+    - cached: asking for the correlations and betas again without a new load, which only checks the data versions
+    - loop_correlations (--compare-loop): the same correlations as a pandas loop over the groups, symbols and lags,
+      for the first 10 symbols only and scaled up to the whole universe
+
+sample statement to run >>python3 -m Benchmarks.SentimentPriceBenchmark --groups 32 --symbols 500 --days 365
+"""
+
+#imports
+import argparse
+import shutil
+import sqlite3 as db
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from Benchmarks.BenchmarkResults import BenchmarkResults
+from PythonDataModules.AdjustedDailyStockExtract import AdjustedDailyStockExtract
+from PythonDataModules.SentimentAggregates import SentimentAggregates
+from PythonDataModules.SentimentPriceAnalytics import SentimentPriceAnalytics
+from PythonDataModules.TweetStore import TweetStore
+
+__author__ = "Dylan Smith"
+__copyright__ = "Copyright (C) 2018 Dylan Smith"
+__credits__ = ["Dylan Smith"]
+
+__license__ = "Personal Use"
+__version__ = "1.0"
+__maintainer__ = "Dylan Smith"
+__email__ = "-"
+__status__ = "Development"
+
+def createSentimentDatabase(db_path, groups, days, rand):
+    """
+    Write an hourly sentiment bucket at noon for every group and day, skipping some days as if nothing was tweeted
+
+    ::param db_path: the path of the database to create
+    ::param groups: the groups to write sentiment for
+    ::param days: the list of days (datetime.date)
+    ::param rand: the numpy random generator
+    returns - the connection to the database
+    """
+    connection = db.connect(str(db_path))
+    tweet_store = TweetStore(connection, groups)
+    tweet_store.createTweetTables()
+    SentimentAggregates(connection).createAggregateTables()
+    rows = []
+    for group in groups:
+        counts = rand.integers(0, 200, len(days))
+        sums = rand.normal(0.1, 0.3, len(days)) * counts
+        for d, tweet_count, sentiment_sum in zip(days, counts.tolist(), sums.tolist()):
+            if tweet_count > 0:
+                rows.append((group, int(d.strftime('%Y%m%d')) * 100 + 12, d.strftime('%b%d%Y'), sentiment_sum,
+                             sentiment_sum ** 2 / tweet_count, tweet_count))
+    connection.executemany("INSERT INTO HourlySentiment VALUES (?,?,?,?,?,?)", rows)
+    tweet_store.recordLoadCompletion('benchmark')
+    return connection
+
+def createStockDatabase(db_path, symbols, days, rand):
+    """
+    Write a random walk of prices on the weekdays for every symbol, in the tables of AdjustedDailyStockExtract
+
+    ::param db_path: the path of the database to create
+    ::param symbols: the symbols to write prices for
+    ::param days: the list of days (datetime.date)
+    ::param rand: the numpy random generator
+    returns - the connection to the database
+    """
+    connection = db.connect(str(db_path))
+    fields = AdjustedDailyStockExtract.fields
+    trading_days = [d.isoformat() for d in days if d.weekday() < 5]
+    for symbol in symbols:
+        connection.execute("CREATE TABLE %s (day text PRIMARY KEY, %s)" % (symbol, ','.join([f + ' REAL' for f in fields[1:]])))
+        closes = 100 * np.cumprod(1 + rand.normal(0, 0.02, len(trading_days)))
+        volumes = rand.integers(100000, 10000000, len(trading_days)).astype(float)
+        connection.executemany("INSERT INTO %s (day, adjusted_close, volume) VALUES (?,?,?)" % symbol,
+                               zip(trading_days, closes.tolist(), volumes.tolist()))
+    connection.commit()
+    return connection
+
+def loopCorrelations(analytics, groups, symbols, start_date, end_date, lags):
+    """
+    Calculate the lagged correlations one (group, symbol, lag) at a time with pandas, the way it would be done
+    without SentimentPriceAnalytics
+    """
+    aligned = analytics.alignSeries(groups, symbols, start_date, end_date)
+    correlations = {}
+    for n, group in enumerate(groups):
+        sentiment = pd.Series(aligned['sentiment'][n])
+        for m, symbol in enumerate(symbols):
+            returns = pd.Series(aligned['return'][m])
+            for lag in lags:
+                correlations[(group, symbol, lag)] = sentiment.shift(lag).corr(returns)
+    return correlations
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Time the sentiment and price analytics')
+    parser.add_argument('--groups', type = int, default = 32, help = 'the number of groups')
+    parser.add_argument('--symbols', type = int, default = 500, help = 'the number of symbols')
+    parser.add_argument('--days', type = int, default = 365, help = 'the number of calendar days')
+    parser.add_argument('--lags', type = int, default = 5, help = 'the correlations use the lags 0 to LAGS')
+    parser.add_argument('--window', type = int, default = 20, help = 'the trading days in each rolling beta')
+    parser.add_argument('--compare-loop', action = 'store_true', help = 'also time the correlations as a pandas loop')
+    parser.add_argument('--save-baseline', action = 'store_true', help = 'save this run as the new baseline')
+    args = parser.parse_args(argv)
+
+    groups = ['Group%03i' % n for n in range(args.groups)]
+    symbols = ['SYM%04i' % n for n in range(args.symbols)]
+    end_date = date(2018, 10, 14)
+    start_date = end_date - timedelta(days = args.days - 1)
+    days = [start_date + timedelta(days = n) for n in range(args.days)]
+    lags = list(range(args.lags + 1))
+    case = '%ix%i' % (args.groups, args.symbols)
+
+    results = BenchmarkResults('SentimentPriceBenchmark', min_seconds = 0.01)
+    work_dir = Path(tempfile.mkdtemp(prefix = 'twtr_price_bench_'))
+    try:
+        rand = np.random.default_rng(2018)
+        sentiment_connection = createSentimentDatabase(work_dir.joinpath('CleansedData.db'), groups, days, rand)
+        stock_connection = createStockDatabase(work_dir.joinpath('Stocks.db'), symbols, days, rand)
+        analytics = SentimentPriceAnalytics(sentiment_connection, stock_connection)
+
+        with results.timeStage(case, 'align'):
+            analytics.getAlignedSeries(groups, symbols, start_date, end_date)
+        with results.timeStage(case, 'correlations'):
+            analytics.getLaggedCorrelations(groups, symbols, start_date, end_date, lags)
+        with results.timeStage(case, 'rolling_betas'):
+            analytics.getRollingBetas(groups, symbols, start_date, end_date, args.window, lags)
+        with results.timeStage(case, 'cached'):
+            analytics.getLaggedCorrelations(groups, symbols, start_date, end_date, lags)
+            analytics.getRollingBetas(groups, symbols, start_date, end_date, args.window, lags)
+        if args.compare_loop:
+            loop_symbols = symbols[:10]
+            loop_start = time.perf_counter()
+            loopCorrelations(analytics, groups, loop_symbols, start_date, end_date, lags)
+            results.addTiming(case, 'loop_correlations', (time.perf_counter() - loop_start) * len(symbols) / len(loop_symbols))
+        sentiment_connection.close()
+        stock_connection.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors = True)
+    return 0 if results.reportResults(args.save_baseline) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,163 @@
+##!/usr/bin/env python
+"""
+Synthetic Tweet Generator: Writes raw tweet files in the exact format that the TwitterScraper drops into
+DataSources/Twitter so that the cleanser and the sentiment tool can be benchmarked without the Twitter API.
+
+Every group directory receives one tab separated .csv.gz per day, appended to in pages of 100 records so that
+each file is a concatenation of gzip members exactly like the output of TwitterScraper.downloadTweetsForQuery.
+Records carry the columns (id, user, date, full_text, replied_to_id, retweeted_id) with empty strings for the
+ids of tweets that are not replies or retweets.
+"""
+
+#imports
+import csv
+import gzip
+import json
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+__author__ = "Dylan Smith"
+__copyright__ = "Copyright (C) 2018 Dylan Smith"
+__credits__ = ["Dylan Smith"]
+
+__license__ = "Personal Use"
+__version__ = "1.0"
+__maintainer__ = "Dylan Smith"
+__email__ = "-"
+__status__ = "Development"
+
+class SyntheticTweetGenerator(object):
+    #constants
+    default_groups = ['Bears', 'Packers', 'Vikings', 'Lions', 'Cowboys', 'Giants', 'Eagles', 'Redskins']
+    twitter_date_fmt = '%a %b %d %H:%M:%S +0000 %Y'
+    page_size = 100
+    positive_words = ['great', 'win', 'love', 'awesome', 'amazing', 'happy', 'best', 'strong', 'clutch', 'excited']
+    negative_words = ['terrible', 'loss', 'hate', 'awful', 'worst', 'sad', 'weak', 'injured', 'fumble', 'angry']
+    neutral_words = ['game', 'team', 'coach', 'season', 'today', 'defense', 'offense', 'quarterback', 'week',
+                     'draft', 'stadium', 'fans', 'play', 'score', 'half', 'drive', 'field', 'trade', 'roster']
+
+    def __init__(self, seed = 2018, reply_ratio = 0.15, retweet_ratio = 0.35, unknown_parent_ratio = 0.1):
+        """
+        Instantiates a generator.  The ratios describe the share of all records that are replies and retweets,
+        the remainder being original tweets.
+
+        ::param seed: The seed for the random number generator so that runs are reproducible
+        ::param reply_ratio: The share of the records that reply to another tweet
+        ::param retweet_ratio: The share of the records that are retweets of an original tweet
+        ::param unknown_parent_ratio: The share of the replies whose parent is not part of the generated data
+        """
+        self.random = random.Random(seed)
+        self.reply_ratio = reply_ratio
+        self.retweet_ratio = retweet_ratio
+        self.unknown_parent_ratio = unknown_parent_ratio
+        self.users = ['fan_%i' % i for i in range(5000)]
+
+    def createTweetText(self):
+        """
+        Build a short tweet out of a random mix of positive, negative and neutral words
+
+        returns - a string of text that has already been cleaned the way TwitterScraper.cleanTweet would
+        """
+        words = self.random.sample(self.neutral_words, self.random.randint(3, 8))
+        for _ in range(self.random.randint(0, 2)):
+            words.insert(self.random.randint(0, len(words)), self.random.choice(self.positive_words))
+        for _ in range(self.random.randint(0, 2)):
+            words.insert(self.random.randint(0, len(words)), self.random.choice(self.negative_words))
+        if self.random.random() < 0.2:
+            words.append('#' + self.random.choice(self.default_groups))
+        return ' '.join(words)
+
+    def createProject(self, root_dir, project_area, project_name, groups):
+        """
+        Create the directory structure described in FileDirectory.txt for a synthetic project, including the
+        aggregate files and the query file that the TwitterAnalysisTool expects to exist.
+
+        ::param root_dir: The directory that plays the part of the repository root
+        ::param project_area: The project area folder name
+        ::param project_name: The project name folder
+        ::param groups: A list of the group names for the project
+        returns - A tuple of (project data directory, project analysis directory)
+        """
+        proj_data_dir = Path(root_dir).joinpath('DataSources', 'Twitter', project_name)
+        proj_analysis_dir = Path(root_dir).joinpath(project_area, project_name)
+        proj_analysis_dir.mkdir(parents = True, exist_ok = True)
+        for group in groups:
+            proj_data_dir.joinpath(group).mkdir(parents = True, exist_ok = True)
+
+        header = ','.join(['Date'] + groups) + '\n'
+        for file_name in ['CalculatedSentimentData.csv', 'RecordCounts.csv']:
+            with open(proj_analysis_dir.joinpath(file_name), 'w') as file:
+                file.write(header)
+
+        qry_data = {"SearchParameters": {"count": 100, "lang": "en", "tweet_mode": "extended"},
+                    "GroupQueries": {group: {"Query": group, "MaxRecord": 0, "LastUpdate": ""} for group in groups}}
+        with open(proj_analysis_dir.joinpath('TwitterSearchQueries.json'), 'w') as fp:
+            json.dump(qry_data, fp, indent = 2)
+        return proj_data_dir, proj_analysis_dir
+
+    def writeRawTweets(self, proj_data_dir, groups, total_tweets, days = 7, end_date = None):
+        """
+        Generate the raw tweet files for all groups.  Tweets are spread evenly over the groups and days, with each
+        day written out in pages the same way that the scraper appends to the daily file.
+
+        ::param proj_data_dir: The data directory for the project (DataSources/Twitter/ProjectName)
+        ::param groups: A list of the group names, each must already exist as a directory
+        ::param total_tweets: The total number of records to write across all groups and days
+        ::param days: The number of distinct days that the tweets span
+        ::param end_date: The last day (datetime) of the span.  Defaults to a fixed date for reproducibility
+        returns - A dictionary with the number of originals, replies and retweets that were written
+        """
+        end_date = end_date or datetime(2018, 10, 14)
+        start_date = end_date - timedelta(days = days - 1)
+        per_file = max(1, total_tweets // (days * len(groups)))
+        next_id = 1050000000000000000
+        originals, recent_ids = [], []
+        counts = {'originals': 0, 'replies': 0, 'retweets': 0}
+
+        for day_num in range(days):
+            day = start_date + timedelta(days = day_num)
+            for group in groups:
+                rows = []
+                seconds = sorted(self.random.randint(0, 86399) for _ in range(per_file))
+                for second in seconds:
+                    next_id += self.random.randint(1, 5000)
+                    created_at = (day + timedelta(seconds = second)).strftime(self.twitter_date_fmt)
+                    user = self.random.choice(self.users)
+                    draw = self.random.random()
+                    if draw < self.retweet_ratio and originals:
+                        #retweets carry the text of the tweet that they are retweeting
+                        rt_id, rt_text = self.random.choice(originals[-2000:])
+                        rows.append([next_id, user, created_at, rt_text, '', rt_id])
+                        counts['retweets'] += 1
+                    elif draw < self.retweet_ratio + self.reply_ratio and recent_ids:
+                        if self.random.random() < self.unknown_parent_ratio:
+                            parent_id = self.random.randint(900000000000000000, 1000000000000000000)
+                        else:
+                            parent_id = self.random.choice(recent_ids[-2000:])
+                        rows.append([next_id, user, created_at, self.createTweetText(), parent_id, ''])
+                        recent_ids.append(next_id)
+                        counts['replies'] += 1
+                    else:
+                        text = self.createTweetText()
+                        rows.append([next_id, user, created_at, text, '', ''])
+                        originals.append((next_id, text))
+                        recent_ids.append(next_id)
+                        counts['originals'] += 1
+                #keep the parent pools bounded so memory stays flat for large runs
+                del originals[:-5000], recent_ids[:-5000]
+                #the search api returns the newest tweets first and each page is appended as its own gzip member
+                rows.reverse()
+                raw_file = Path(proj_data_dir).joinpath(group, group + day.strftime('%Y%m%d') + '.csv.gz')
+                for page_start in range(0, len(rows), self.page_size):
+                    with gzip.open(raw_file, 'at', encoding = 'utf-8', newline = '') as file:
+                        writer = csv.writer(file, delimiter = '\t', lineterminator = '\n')
+                        writer.writerows(rows[page_start:page_start + self.page_size])
+        return counts
+
+if __name__ == '__main__':
+    #sample statement to run >>python3 -m Benchmarks.SyntheticTweetGenerator /tmp/bench SportsSentiment NFL 100000
+    import sys
+    generator = SyntheticTweetGenerator()
+    data_dir, _ = generator.createProject(sys.argv[1], sys.argv[2], sys.argv[3], generator.default_groups)
+    print(generator.writeRawTweets(data_dir, generator.default_groups, int(sys.argv[4])))
@@ -0,0 +1,57 @@
+##!/usr/bin/env python
+"""
+Result Cache: A thread safe LRU cache for the results that the readers of a project calculate from its databases.
+
+Each result is stored against the version of the data that it was calculated from, such as the latest load_id in the
+LoadLog of the project.  A result is only returned for the version it was calculated from, so a new load or download
+makes the cached results out of date without anything having to clear them; they are dropped as the least recently
+used once the cache is full.
+"""
+
+#imports
+import threading
+from collections import OrderedDict
+
+__author__ = "Dylan Smith"
+__copyright__ = "Copyright (C) 2018 Dylan Smith"
+__credits__ = ["Dylan Smith"]
+
+__license__ = "Personal Use"
+__version__ = "1.0"
+__maintainer__ = "Dylan Smith"
+__email__ = "-"
+__status__ = "Development"
+
+class ResultCache(object):
+
+    def __init__(self, cache_size = 256):
+        """
+        ::param cache_size(Optional): the number of results to keep.  0 turns the cache off
+        """
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.cache_lock = threading.Lock()
+
+    #Basic Methods
+    def returnResult(self, key, version, calculate):
+        """
+        Return a result from the cache, or calculate and cache it.  The calculation runs outside of the lock so that
+        other threads can use the cache while it runs.
+
+        ::param key: the arguments that identify the result
+        ::param version: the version of the data that the result is calculated from
+        ::param calculate: a function without arguments that calculates the result
+        returns - the result
+        """
+        key = (key, version)
+        with self.cache_lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+        result = calculate()
+        if self.cache_size > 0:
+            with self.cache_lock:
+                self.cache[key] = result
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last = False)
+        return result
@@ -0,0 +1,224 @@
+##!/usr/bin/env python
+"""
+Sentiment Aggregates: Keeps mergeable sentiment totals for every group and hour so that hourly, daily and rolling
+window sentiment can be reported without re-reading the tweets.
+
+The state of each (group, hour) bucket in HourlySentiment is the sum of the sentiment, the sum of the squared
+sentiment and the tweet count.  Buckets are merged by adding them, so scored tweets are added to the buckets as they
+arrive and any window is the sum of its buckets; the mean is sentiment_sum / tweet_count and the variance is
+sentiment_sq_sum / tweet_count - mean ** 2.  DailySentiment is a view that adds up the hours of each day.
+
+Rolling 7 and 30 day windows are derived from the buckets with cumulative sums over a dense (group x period) matrix,
+so every group and every window end is computed at once.
+"""
+
+#imports
+import logging
+from datetime import timedelta
+import numpy as np
+
+__author__ = "Dylan Smith"
+__copyright__ = "Copyright (C) 2018 Dylan Smith"
+__credits__ = ["Dylan Smith"]
+
+__license__ = "Personal Use"
+__version__ = "1.0"
+__maintainer__ = "Dylan Smith"
+__email__ = "-"
+__status__ = "Development"
+
+class SentimentAggregates(object):
+    #constants
+    hourly_fields = """grp TEXT, hour_key INT, day TEXT, sentiment_sum REAL, sentiment_sq_sum REAL, tweet_count INT,
+        PRIMARY KEY (grp, hour_key)"""
+    #the datetime column is in the format 'Wed Oct 10 20:19:24 -0500 2018' so the hour starts at the 12th character
+    hour_key_sql = "day_key * 100 + CAST(substr(datetime, 12, 2) AS INT)"
+    merge_sql = """ON CONFLICT (grp, hour_key) DO UPDATE SET sentiment_sum = sentiment_sum + excluded.sentiment_sum,
+        sentiment_sq_sum = sentiment_sq_sum + excluded.sentiment_sq_sum, tweet_count = tweet_count + excluded.tweet_count"""
+
+    def __init__(self, db_connection):
+        """
+        ::param db_connection: a database connection to a sqlite database that has the Tweets table
+        """
+        self.connection = db_connection
+
+    #Basic Methods
+    def returnBucketSQL(self, source, where = '1 = 1'):
+        """
+        ::param source: the table (in the layout of Tweets) that the buckets are built from
+        ::param where(Optional): a filter on the rows of the source, which is aliased as s
+        returns - a SELECT of the hourly buckets of the rows in the source
+        """
+        return """SELECT grp, %s, day, SUM(sentiment), SUM(sentiment * sentiment), COUNT(*) FROM %s s
+            WHERE %s GROUP BY grp, 2""" % (self.hour_key_sql, source, where)
+
+    def returnDailyTotalsSQL(self, tweet_store, groups):
+        """
+        Build the query of the daily sentiment totals of groups for the readers that do not write to the database.  The
+        totals come from the buckets, which only hold scored tweets, so tweets that have been cleansed and not scored
+        yet do not pull the means towards 0.  A database that has not been migrated has no buckets and is read from its
+        per group tables, which hold the sentiment that the old score stage wrote.
+
+        ::param tweet_store: the TweetStore of the database
+        ::param groups: the groups to return
+        returns - a SELECT of (grp, day_key, day, sentiment_sum, tweet_count) that takes the groups followed by the first
+                  and last day_key as parameters, or None if the database has no scored tweets
+        """
+        table_types = tweet_store.returnTableTypes()
+        group_wildcards = ','.join(['?'] * len(groups))
+        if 'HourlySentiment' in table_types:
+            return """SELECT grp, hour_key / 100, day, SUM(sentiment_sum), SUM(tweet_count) FROM HourlySentiment
+                WHERE grp IN (%s) AND hour_key BETWEEN ? * 100 AND ? * 100 + 23 GROUP BY grp, hour_key / 100""" % group_wildcards
+        if 'Tweets' not in table_types:
+            return """SELECT grp, day_key, day, SUM(sentiment), COUNT(*) FROM %s WHERE grp IN (%s) AND day_key BETWEEN ? AND ?
+                GROUP BY grp, day_key""" % (tweet_store.returnTweetSource(), group_wildcards)
+        return None
+
+    def createAggregateTables(self):
+        """
+        Create HourlySentiment and the DailySentiment view.  A DailySentiment table from before the hourly buckets is
+        replaced.  When HourlySentiment is new and there are tweets already, the buckets are rebuilt from the Tweets
+        table.
+        """
+        table_types = dict(self.connection.execute("SELECT name, type FROM sqlite_master").fetchall())
+        self.connection.execute("CREATE TABLE IF NOT EXISTS HourlySentiment (%s) WITHOUT ROWID" % self.hourly_fields)
+        if table_types.get('DailySentiment') == 'table':
+            self.connection.execute("DROP TABLE DailySentiment")
+        if 'HourlySentiment' not in table_types and 'Tweets' in table_types and \
+                self.connection.execute("SELECT 1 FROM Tweets LIMIT 1").fetchone() is not None:
+            logging.info("Rebuilding the hourly sentiment from the Tweets table")
+            self.rebuildHourlySentiment()
+        self.connection.execute("""CREATE VIEW IF NOT EXISTS DailySentiment AS SELECT grp, day, SUM(sentiment_sum) AS sentiment_sum,
+            SUM(sentiment_sq_sum) AS sentiment_sq_sum, SUM(tweet_count) AS tweet_count FROM HourlySentiment
+            GROUP BY grp, hour_key / 100""")
+        self.connection.commit()
+
+    def rebuildHourlySentiment(self):
+        """
+        Rebuild every bucket from the tweets.  This is only needed when the buckets are created for an existing database
+        """
+        self.connection.execute("DELETE FROM HourlySentiment")
+        self.connection.execute("INSERT INTO HourlySentiment %s" % self.returnBucketSQL('Tweets'))
+        self.connection.commit()
+
+    def resetGroup(self, group):
+        """
+        ::param group: the group whose buckets are cleared before all of its tweets are reloaded
+        """
+        self.connection.execute("DELETE FROM HourlySentiment WHERE grp = ?", (group,))
+        self.connection.commit()
+
+    def mergeNewTweets(self, source):
+        """
+        Add the scored tweets of a staging table to the buckets.  Tweets that are already in the Tweets table have been
+        counted before and are skipped, so this has to run before the staged tweets are inserted into Tweets.
+
+        ::param source: the staging table, in the layout of Tweets
+        """
+        new_tweets = "NOT EXISTS (SELECT 1 FROM Tweets t WHERE t.grp = s.grp AND t.id = s.id)"
+        self.connection.execute("INSERT INTO HourlySentiment %s %s" % (self.returnBucketSQL(source, new_tweets), self.merge_sql))
+
+    def replaceDay(self, group, day_key):
+        """
+        Replace the buckets of a day with the totals of its tweets, after the whole day has been re-scored
+
+        ::param group: the group that was re-scored
+        ::param day_key: the day that was re-scored as YYYYMMDD
+        """
+        self.replaceDayForGroups([group], day_key)
+
+    def replaceDayForGroups(self, groups, day_key):
+        """
+        Replace the buckets of a day for several groups at once, after the day has been re-scored for all of them.  A
+        group without tweets on the day is left with no buckets for it.
+
+        ::param groups: a list of the groups that were re-scored
+        ::param day_key: the day that was re-scored as YYYYMMDD
+        """
+        group_wildcards = ','.join(['?'] * len(groups))
+        self.connection.execute("DELETE FROM HourlySentiment WHERE grp IN (%s) AND hour_key BETWEEN ? AND ?" % group_wildcards,
+                                tuple(groups) + (day_key * 100, day_key * 100 + 23))
+        self.connection.execute("INSERT INTO HourlySentiment %s" %
+                                self.returnBucketSQL('Tweets', 's.grp IN (%s) AND s.day_key = ?' % group_wildcards),
+                                tuple(groups) + (day_key,))
+
+    def getHourlyBuckets(self, groups, start_date, end_date):
+        """
+        Read the buckets of a date range into dense matrices with one row per group and one column per hour.  Hours
+        without tweets are 0, as is every hour of a database that has never been scored and has no buckets.
+
+        ::param groups: a list of the groups to read
+        ::param start_date: the first day of the range (datetime.date)
+        ::param end_date: the last day of the range (datetime.date)
+        returns - a tuple of (sentiment_sum, sentiment_sq_sum, tweet_count) arrays of shape (groups, hours)
+        """
+        num_days = (end_date - start_date).days + 1
+        day_index = {int((start_date + timedelta(days = n)).strftime('%Y%m%d')): n for n in range(num_days)}
+        group_index = {group: n for n, group in enumerate(groups)}
+        buckets = np.zeros((3, len(groups), num_days * 24))
+
+        bucket_sql = """SELECT grp, hour_key, sentiment_sum, sentiment_sq_sum, tweet_count FROM HourlySentiment
+            WHERE grp IN (%s) AND hour_key BETWEEN ? AND ?""" % ','.join(['?'] * len(groups))
+        if self.connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'HourlySentiment'").fetchone() is None:
+            rows = []
+        else:
+            rows = self.connection.execute(bucket_sql, list(groups) + [min(day_index) * 100, max(day_index) * 100 + 23]).fetchall()
+        if rows:
+            grps, hour_keys, sums, sq_sums, counts = zip(*rows)
+            hour_keys = np.array(hour_keys)
+            cols = np.array([day_index[key] for key in (hour_keys // 100).tolist()]) * 24 + hour_keys % 100
+            group_rows = np.array([group_index[group] for group in grps])
+            buckets[:, group_rows, cols] = np.array([sums, sq_sums, counts])
+        return buckets[0], buckets[1], buckets[2]
+
+    def getRollingSentiment(self, groups, start_date, end_date, window_days = (7, 30), step = 'day'):
+        """
+        Calculate the rolling mean, standard deviation and tweet count of the sentiment for each group.  Each window
+        covers the window_days worth of periods that end with (and include) the period it is reported for, so the
+        buckets before start_date that the longest window needs are read as well.
+
+        ::param groups: a list of the groups to calculate
+        ::param start_date: the first window end to report (datetime.date)
+        ::param end_date: the last window end to report (datetime.date)
+        ::param window_days(Optional): the lengths of the windows in days
+        ::param step(Optional): 'day' for one window per day or 'hour' for one window per hour
+        returns - a dictionary {'groups': groups, 'periods': [YYYYMMDD or YYYYMMDDHH], window_days: {'mean', 'std',
+                  'count'}} where each statistic is an array of shape (groups, periods).  The mean and std are NaN
+                  for windows without tweets.
+        """
+        if step not in ('day', 'hour'):
+            raise ValueError("step must be 'day' or 'hour'")
+        #an hourly window that ends at midnight reaches back into one more calendar day than a daily window
+        lead_days = max(window_days) - 1 if step == 'day' else max(window_days)
+        sums, sq_sums, counts = self.getHourlyBuckets(groups, start_date - timedelta(days = lead_days), end_date)
+        periods_per_day = 24 if step == 'hour' else 1
+        if step == 'day':
+            sums, sq_sums, counts = [m.reshape(len(groups), -1, 24).sum(axis = 2) for m in (sums, sq_sums, counts)]
+
+        num_periods = ((end_date - start_date).days + 1) * periods_per_day
+        first = lead_days * periods_per_day
+        #cumulative sums with a leading 0 so the total of any window is a single difference
+        cum_sums, cum_sq_sums, cum_counts = [np.concatenate([np.zeros((len(groups), 1)), m.cumsum(axis = 1)], axis = 1)
+                                             for m in (sums, sq_sums, counts)]
+        results = {'groups': list(groups), 'periods': self.returnPeriods(start_date, end_date, step)}
+        for days in window_days:
+            width = days * periods_per_day
+            ends = np.arange(first, first + num_periods) + 1
+            window_sum, window_sq_sum, window_count = [c[:, ends] - c[:, ends - width] for c in (cum_sums, cum_sq_sums, cum_counts)]
+            with np.errstate(invalid = 'ignore', divide = 'ignore'):
+                mean = np.where(window_count > 0, window_sum / window_count, np.nan)
+                variance = np.where(window_count > 0, window_sq_sum / window_count - mean ** 2, np.nan)
+            results[days] = {'mean': mean, 'std': np.sqrt(np.clip(variance, 0, None)), 'count': window_count.astype(int)}
+        return results
+
+    def returnPeriods(self, start_date, end_date, step):
+        """
+        ::param start_date: the first day (datetime.date)
+        ::param end_date: the last day (datetime.date)
+        ::param step: 'day' or 'hour'
+        returns - the keys of the periods between the days, as YYYYMMDD for days or YYYYMMDDHH for hours
+        """
+        day_keys = [int((start_date + timedelta(days = n)).strftime('%Y%m%d')) for n in range((end_date - start_date).days + 1)]
+        if step == 'day':
+            return day_keys
+        return [day_key * 100 + hour for day_key in day_keys for hour in range(24)]
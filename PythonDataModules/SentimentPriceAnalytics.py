@@ -0,0 +1,273 @@
+##!/usr/bin/env python
+"""
+Sentiment Price Analytics: Lines up the daily sentiment of the groups of a project with the prices that
+AdjustedDailyStockExtract stores for each symbol, and measures how they move together.
+
+The series are aligned on the trading days of the symbols.  The sentiment and tweet count of a trading day cover
+every calendar day since the previous trading day, so the tweets of a weekend count towards the Monday.  The return of
+a symbol is the change in its adjusted_close since its previous price.
+
+Every (group, symbol, lag) combination is calculated at once: the lagged sentiment of all of the groups is stacked
+into one (lags x groups x days) array and multiplied with the (symbols x days) prices, with missing values masked out
+so that each pair only uses the days that both series have.  Results are cached against the versions of the data that
+they were calculated from, the latest load in the LoadLog of the project and the row count and last day of each
+symbol, so they are recalculated only after a new load or price download.
+"""
+
+#imports
+import logging
+import sqlite3 as db
+import warnings
+from datetime import timedelta
+import numpy as np
+from PythonDataModules.ResultCache import ResultCache
+from PythonDataModules.SentimentAggregates import SentimentAggregates
+
+__author__ = "Dylan Smith"
+__copyright__ = "Copyright (C) 2018 Dylan Smith"
+__credits__ = ["Dylan Smith"]
+
+__license__ = "Personal Use"
+__version__ = "1.0"
+__maintainer__ = "Dylan Smith"
+__email__ = "-"
+__status__ = "Development"
+
+class SentimentPriceAnalytics(object):
+    #constants
+    sentiment_series = ['sentiment', 'count']
+    price_series = ['return', 'volume']
+
+    def __init__(self, sentiment_connection, stock_connection, cache_size = 32):
+        """
+        ::param sentiment_connection: a connection to the CleansedData.db of the project
+        ::param stock_connection: a connection to the database of AdjustedDailyStockExtract
+        ::param cache_size(Optional): the number of results to keep in the cache.  0 turns the cache off
+        """
+        self.sentiment_connection = sentiment_connection
+        self.stock_connection = stock_connection
+        self.sentiment_aggregates = SentimentAggregates(sentiment_connection)
+        self.result_cache = ResultCache(cache_size)
+
+    #Basic Methods
+    def returnDataVersions(self, symbols):
+        """
+        ::param symbols: the symbols whose prices are used
+        returns - a tuple of the last load_id of the project and a (row count, last day) for each symbol
+        """
+        try:
+            load_id = self.sentiment_connection.execute("SELECT MAX(load_id) FROM LoadLog").fetchone()[0] or 0
+        except db.OperationalError:
+            load_id = 0
+        return (load_id, tuple(self.returnStockVersion(symbol) for symbol in symbols))
+
+    def returnStockVersion(self, symbol):
+        """
+        ::param symbol: the symbol of the stock
+        returns - a tuple of the number of days stored for the symbol and the last day
+        """
+        try:
+            return tuple(self.stock_connection.execute('SELECT COUNT(*), MAX(day) FROM "%s"' % symbol).fetchone())
+        except db.OperationalError:
+            raise ValueError('no prices have been downloaded for %s' % symbol)
+
+    def readPrices(self, symbol, start_date, end_date):
+        """
+        Read the prices of a symbol, along with the last price before the range so that the first day has a return
+
+        ::param symbol: the symbol of the stock
+        ::param start_date: the first day of the range (datetime.date)
+        ::param end_date: the last day of the range (datetime.date)
+        returns - a tuple of (day keys as YYYYMMDD, returns, volumes) as arrays for the trading days in the range
+        """
+        start_day, end_day = start_date.isoformat(), end_date.isoformat()
+        rows = self.stock_connection.execute("""SELECT day, adjusted_close, volume FROM "%s" WHERE day BETWEEN ? AND ?
+            ORDER BY day""" % symbol, (start_day, end_day)).fetchall()
+        previous = self.stock_connection.execute("""SELECT adjusted_close FROM "%s" WHERE day < ?
+            ORDER BY day DESC LIMIT 1""" % symbol, (start_day,)).fetchone()
+        if not rows:
+            return np.array([], dtype = int), np.array([]), np.array([])
+        days, closes, volumes = zip(*rows)
+        closes = np.array(closes, dtype = float)
+        previous_closes = np.concatenate([[np.nan if previous is None else previous[0]], closes[:-1]])
+        day_keys = np.array([int(day.replace('-', '')) for day in days])
+        return day_keys, closes / previous_closes - 1, np.array(volumes, dtype = float)
+
+    def getAlignedSeries(self, groups, symbols, start_date, end_date):
+        """
+        Line up the daily sentiment of the groups with the prices of the symbols on the trading days in a range.  A
+        trading day is any day that at least one of the symbols has a price for.
+
+        ::param groups: a list of the groups
+        ::param symbols: a list of the symbols
+        ::param start_date: the first day of the range (datetime.date)
+        ::param end_date: the last day of the range (datetime.date)
+        returns - a dictionary {'days': [YYYYMMDD], 'sentiment', 'count': arrays of shape (groups, days),
+                  'return', 'volume': arrays of shape (symbols, days)}.  Missing values are NaN
+        """
+        key = ('aligned', tuple(groups), tuple(symbols), start_date, end_date)
+        return self.result_cache.returnResult(key, self.returnDataVersions(symbols),
+                                              lambda: self.alignSeries(groups, symbols, start_date, end_date))
+
+    def alignSeries(self, groups, symbols, start_date, end_date):
+        """
+        Read and line up the series for getAlignedSeries
+        """
+        prices = [self.readPrices(symbol, start_date, end_date) for symbol in symbols]
+        days = np.unique(np.concatenate([day_keys for day_keys, _, _ in prices] + [np.array([], dtype = int)]))
+        aligned = {'days': days.tolist(),
+                   'return': np.full((len(symbols), len(days)), np.nan),
+                   'volume': np.full((len(symbols), len(days)), np.nan)}
+        for n, (day_keys, returns, volumes) in enumerate(prices):
+            cols = np.searchsorted(days, day_keys)
+            aligned['return'][n, cols] = returns
+            aligned['volume'][n, cols] = volumes
+
+        #the sentiment of a trading day covers the calendar days since the previous trading day
+        num_days = (end_date - start_date).days + 1
+        calendar = np.array([int((start_date + timedelta(days = n)).strftime('%Y%m%d')) for n in range(num_days)])
+        sums, _, counts = self.sentiment_aggregates.getHourlyBuckets(groups, start_date, end_date)
+        cum_sums, cum_counts = [np.concatenate([np.zeros((len(groups), 1)), m.reshape(len(groups), -1, 24).sum(axis = 2).cumsum(axis = 1)], axis = 1)
+                                for m in (sums, counts)]
+        ends = np.searchsorted(calendar, days) + 1
+        starts = np.concatenate([[0], ends[:-1]]).astype(int)
+        day_sums, day_counts = [c[:, ends] - c[:, starts] for c in (cum_sums, cum_counts)]
+        with np.errstate(invalid = 'ignore', divide = 'ignore'):
+            aligned['sentiment'] = np.where(day_counts > 0, day_sums / day_counts, np.nan)
+        aligned['count'] = day_counts
+        logging.info('-- Aligned %i groups and %i symbols on %i trading days --' % (len(groups), len(symbols), len(days)))
+        return aligned
+
+    def returnLaggedStack(self, series, lags):
+        """
+        ::param series: an array of shape (rows, days)
+        ::param lags: a list of lags in days.  A lag of k puts the value of day t at day t + k
+        returns - an array of shape (lags, rows, days) with NaN where a lagged value falls outside the days
+        """
+        num_days = series.shape[1]
+        stack = np.full((len(lags),) + series.shape, np.nan)
+        for n, lag in enumerate(lags):
+            if lag >= 0:
+                stack[n, :, lag:] = series[:, :max(num_days - lag, 0)]
+            else:
+                stack[n, :, :num_days + lag] = series[:, -lag:]
+        return stack
+
+    def returnModelInputs(self, groups, symbols, start_date, end_date, lags, x, y):
+        """
+        Validate the series names and return the lagged sentiment and the prices, centered on their means so that the
+        sums of squares stay small.  Centering does not change a covariance, correlation or beta.
+
+        returns - a tuple of (aligned series, lagged x of shape (lags, groups, days), y of shape (symbols, days))
+        """
+        if x not in self.sentiment_series:
+            raise ValueError('x must be one of %s' % ', '.join(self.sentiment_series))
+        if y not in self.price_series:
+            raise ValueError('y must be one of %s' % ', '.join(self.price_series))
+        aligned = self.getAlignedSeries(groups, symbols, start_date, end_date)
+        with warnings.catch_warnings():
+            #a series without any values has a NaN mean, which is what it should be
+            warnings.simplefilter('ignore', RuntimeWarning)
+            x_values = aligned[x] - np.nanmean(aligned[x], axis = 1, keepdims = True)
+            y_values = aligned[y] - np.nanmean(aligned[y], axis = 1, keepdims = True)
+        return aligned, self.returnLaggedStack(x_values, lags), y_values
+
+    def getLaggedCorrelations(self, groups, symbols, start_date, end_date, lags = range(0, 6), x = 'sentiment', y = 'return'):
+        """
+        Calculate the correlation between the sentiment of every group and the prices of every symbol, with the
+        sentiment leading the prices by each of the lags.  Each pair uses the days where both of its values are known.
+
+        ::param groups: a list of the groups
+        ::param symbols: a list of the symbols
+        ::param start_date: the first day of the range (datetime.date)
+        ::param end_date: the last day of the range (datetime.date)
+        ::param lags(Optional): the number of trading days that the sentiment leads the prices by
+        ::param x(Optional): the sentiment series, 'sentiment' or 'count'
+        ::param y(Optional): the price series, 'return' or 'volume'
+        returns - a dictionary {'groups', 'symbols', 'lags', 'correlation': array of shape (groups, symbols, lags),
+                  'observations': the number of days used for each correlation}.  The correlation is NaN where fewer
+                  than 3 days are shared or a series does not vary
+        """
+        lags = list(lags)
+        key = ('correlation', tuple(groups), tuple(symbols), start_date, end_date, tuple(lags), x, y)
+        return self.result_cache.returnResult(key, self.returnDataVersions(symbols),
+                                              lambda: self.calculateLaggedCorrelations(groups, symbols, start_date,
+                                                                                       end_date, lags, x, y))
+
+    def calculateLaggedCorrelations(self, groups, symbols, start_date, end_date, lags, x, y):
+        """
+        Calculate the correlations for getLaggedCorrelations with one batched matrix product per sum
+        """
+        _, x_stack, y_values = self.returnModelInputs(groups, symbols, start_date, end_date, lags, x, y)
+        x_mask, y_mask = (~np.isnan(x_stack)).astype(float), (~np.isnan(y_values)).astype(float).T
+        x_stack, y_values = np.nan_to_num(x_stack), np.nan_to_num(y_values).T
+        #each product is (lags, groups, days) x (days, symbols) -> (lags, groups, symbols)
+        n = x_mask @ y_mask
+        sum_x, sum_y = x_stack @ y_mask, x_mask @ y_values
+        sum_xx, sum_yy = (x_stack ** 2) @ y_mask, x_mask @ (y_values ** 2)
+        sum_xy = x_stack @ y_values
+        with np.errstate(invalid = 'ignore', divide = 'ignore'):
+            cov = sum_xy - sum_x * sum_y / n
+            var_x, var_y = sum_xx - sum_x ** 2 / n, sum_yy - sum_y ** 2 / n
+            correlation = cov / np.sqrt(var_x * var_y)
+        correlation[(n < 3) | ~(var_x > 0) | ~(var_y > 0)] = np.nan
+        return {'groups': list(groups), 'symbols': list(symbols), 'lags': lags,
+                'correlation': correlation.transpose(1, 2, 0), 'observations': n.astype(int).transpose(1, 2, 0)}
+
+    def getRollingBetas(self, groups, symbols, start_date, end_date, window = 20, lags = (0, 1), x = 'sentiment',
+                        y = 'return', min_periods = None):
+        """
+        Calculate the beta of the prices of every symbol on the sentiment of every group, cov(x, y) / var(x), over a
+        trailing window of trading days that ends on each day.
+
+        ::param groups: a list of the groups
+        ::param symbols: a list of the symbols
+        ::param start_date: the first day of the range (datetime.date)
+        ::param end_date: the last day of the range (datetime.date)
+        ::param window(Optional): the number of trading days in each window
+        ::param lags(Optional): the number of trading days that the sentiment leads the prices by
+        ::param x(Optional): the sentiment series, 'sentiment' or 'count'
+        ::param y(Optional): the price series, 'return' or 'volume'
+        ::param min_periods(Optional): the fewest shared days in a window for a beta.  Defaults to half the window
+        returns - a dictionary {'groups', 'symbols', 'lags', 'days', 'beta': array of shape (groups, symbols, lags,
+                  days)}.  The beta is NaN for the first window - 1 days and where too few days are shared
+        """
+        lags = list(lags)
+        min_periods = max(2, window // 2) if min_periods is None else min_periods
+        key = ('beta', tuple(groups), tuple(symbols), start_date, end_date, window, tuple(lags), x, y, min_periods)
+        return self.result_cache.returnResult(key, self.returnDataVersions(symbols),
+                                              lambda: self.calculateRollingBetas(groups, symbols, start_date, end_date,
+                                                                                 window, lags, x, y, min_periods))
+
+    def calculateRollingBetas(self, groups, symbols, start_date, end_date, window, lags, x, y, min_periods):
+        """
+        Calculate the betas for getRollingBetas.  The windowed sums come from cumulative sums over a (groups, symbols,
+        days) array, built one lag at a time to bound the memory used.
+        """
+        aligned, x_stack, y_values = self.returnModelInputs(groups, symbols, start_date, end_date, lags, x, y)
+        num_days = len(aligned['days'])
+        betas = np.full((len(groups), len(symbols), len(lags), num_days), np.nan)
+        if num_days < window:
+            return {'groups': list(groups), 'symbols': list(symbols), 'lags': lags, 'days': aligned['days'], 'beta': betas}
+
+        y_mask = (~np.isnan(y_values)).astype(float)[None, :, :]
+        y_values = np.nan_to_num(y_values)[None, :, :]
+
+        def windowSums(values):
+            #sums over the trailing windows that end on day window - 1 onwards
+            cum_values = np.cumsum(values, axis = 2)
+            cum_values[:, :, window:] -= cum_values[:, :, :-window].copy()
+            return cum_values[:, :, window - 1:]
+
+        for n in range(len(lags)):
+            x_mask = (~np.isnan(x_stack[n])).astype(float)[:, None, :]
+            x_values = np.nan_to_num(x_stack[n])[:, None, :]
+            count = windowSums(x_mask * y_mask)
+            sum_x, sum_y = windowSums(x_values * y_mask), windowSums(x_mask * y_values)
+            sum_xx, sum_xy = windowSums(x_values ** 2 * y_mask), windowSums(x_values * y_values)
+            with np.errstate(invalid = 'ignore', divide = 'ignore'):
+                var_x = sum_xx - sum_x ** 2 / count
+                beta = (sum_xy - sum_x * sum_y / count) / var_x
+            beta[(count < min_periods) | ~(var_x > 1e-12 * sum_xx)] = np.nan
+            betas[:, :, n, window - 1:] = beta
+        return {'groups': list(groups), 'symbols': list(symbols), 'lags': lags, 'days': aligned['days'], 'beta': betas}
@@ -0,0 +1,283 @@
+##!/usr/bin/env python
+"""
+Tweet Store: Owns the layout of the cleansed tweets in the project database.
+
+All of the cleansed tweets live in one Tweets table keyed by (grp, id).  The table is a WITHOUT ROWID table with the
+primary key (grp, day_key, id) so that the tweets of a group are stored together and in day order, which keeps the
+per-day reads of the sentiment tool and any date range scans to a contiguous part of the table.
+
+Databases from before the Tweets table had one table per group plus an OriginalTweets table.  Those tables are
+migrated into Tweets the first time the store is opened and replaced by read-only views with the same names and
+columns, so existing queries against them keep working.
+
+The ParentText table holds the cleansed text of every original tweet and reply under its id, without the text of the
+tweet it replied to.  It is filled as the tweets are ingested and is never cleared, so the parent of a reply can be
+looked up by id whatever group or load it came from, and a thread can be followed upwards through replied_to_id.
+
+Every completed load is recorded in the LoadLog table.  Readers such as the TwitterSentimentQuery use the latest
+load_id as the version of the data to know when their cached results are out of date.  The days that a delta cleanse
+wrote and that a score re-scored are recorded with the load, so a score that runs in a later process knows which days
+still have to be scored.
+"""
+
+#imports
+import json
+import logging
+from datetime import date, datetime
+
+__author__ = "Dylan Smith"
+__copyright__ = "Copyright (C) 2018 Dylan Smith"
+__credits__ = ["Dylan Smith"]
+
+__license__ = "Personal Use"
+__version__ = "1.0"
+__maintainer__ = "Dylan Smith"
+__email__ = "-"
+__status__ = "Development"
+
+class TweetStore(object):
+    #constants
+    calendar = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+    tweet_column_names = ['day_key', 'id', 'user_id', 'datetime', 'day', 'full_text', 'replied_to_id', 'retweets', 'sentiment']
+    tweet_fields = """grp TEXT, day_key INT, id BIGINT, user_id TEXT, datetime TEXT, day TEXT, full_text TEXT,
+        replied_to_id BIGINT, retweets INT, sentiment REAL"""
+    group_view_columns = "id, user_id, datetime, day, full_text, retweets, sentiment"
+    reply_marker = ' || -> '
+    #the stages of the LoadLog that score the days they list
+    scoring_stages = ['score', 'fused']
+
+    def __init__(self, db_connection, groups):
+        """
+        ::param db_connection: a database connection to a sqlite database
+        ::param groups: the groups of the project.  Each one gets a view of its tweets under the group name
+        """
+        self.connection = db_connection
+        self.groups = groups
+        self.connection.create_function('day_key', 1, self.getDayKey)
+
+    @classmethod
+    def getDayKey(cls, x):
+        """
+        Turn the day of a tweet into a number that sorts in date order
+
+        ::param x: A string as a date in the format of the day column (MonDDYYYY, e.g. Oct102018)
+        returns - an integer in the format YYYYMMDD
+        """
+        return int(x[-4:]) * 10000 + (cls.calendar.index(x[:3]) + 1) * 100 + int(x[3:5])
+
+    @staticmethod
+    def getWeekFromDayKey(day_key):
+        """
+        Get the week number from a day key
+
+        ::param day_key: an integer date in the format YYYYMMDD
+        returns - the ISO week of the year as a string in the format WeekNN|YYYY
+        """
+        iso_year, iso_week, _ = date(day_key // 10000, day_key // 100 % 100, day_key % 100).isocalendar()
+        return 'Week' + str(iso_week) + '|' + str(iso_year)
+
+    def returnTableTypes(self):
+        """
+        returns - a dictionary of every table and view in the database and its type
+        """
+        return dict(self.connection.execute("SELECT name, type FROM sqlite_master WHERE type IN ('table', 'view')"))
+
+    def returnTweetSource(self):
+        """
+        Return something to select the tweets from without changing the database, for the readers that do not write.
+        A database that has not been migrated yet is read from its per group tables, where the replies get a
+        replied_to_id of -1 as they would in the migration.
+
+        returns - the Tweets table, or a sub query with the columns of the Tweets table
+        """
+        table_types = self.returnTableTypes()
+        if table_types.get('Tweets') == 'table':
+            return 'Tweets'
+        selects = ["""SELECT '%s' AS grp, day_key(day) AS day_key, id, user_id, datetime, day, full_text,
+            CASE WHEN instr(full_text, '%s') > 0 THEN -1 ELSE 0 END AS replied_to_id, retweets, sentiment FROM "%s"
+            """ % (group.replace("'", "''"), self.reply_marker, group) for group in self.groups if table_types.get(group) == 'table']
+        if not selects:
+            selects = ["SELECT %s WHERE 0" % ', '.join('NULL AS %s' % c for c in ['grp'] + self.tweet_column_names)]
+        return '(%s)' % ' UNION ALL '.join(selects)
+
+    def createTweetTables(self):
+        """
+        Create the Tweets table and its indexes, migrate any per group tables into it and create the views that
+        stand in for the old tables.  This is safe to call every time the database is opened.
+        """
+        self.connection.execute("CREATE TABLE IF NOT EXISTS Tweets (%s, PRIMARY KEY (grp, day_key, id)) WITHOUT ROWID" % self.tweet_fields)
+        self.connection.execute("CREATE UNIQUE INDEX IF NOT EXISTS Tweets_grp_id ON Tweets (grp, id)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS Tweets_id ON Tweets (id)")
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS LoadLog (load_id INTEGER PRIMARY KEY AUTOINCREMENT, stage TEXT,
+            completed TEXT, days TEXT)""")
+        if 'days' not in [row[1] for row in self.connection.execute("PRAGMA table_info(LoadLog)")]:
+            self.connection.execute("ALTER TABLE LoadLog ADD COLUMN days TEXT")
+        self.connection.commit()
+        #write ahead logging lets the dashboards keep reading while a load is writing
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.migrateGroupTables()
+        #filled after the migration so that the tweets of the old group tables are in it
+        if 'ParentText' not in self.returnTableTypes():
+            self.createParentText()
+        self.createGroupViews()
+
+    def createParentText(self):
+        """
+        Create the ParentText table and fill it from the tweets that are already stored.  The stored text of a reply
+        starts with the text of its parent, which is cut off at the reply marker.
+        """
+        self.connection.execute("CREATE TABLE ParentText (id INTEGER PRIMARY KEY, replied_to_id BIGINT, full_text TEXT)")
+        self.connection.execute("""INSERT OR IGNORE INTO ParentText SELECT id, replied_to_id, CASE WHEN replied_to_id = 0
+            THEN full_text ELSE substr(full_text, instr(full_text, :marker) + length(:marker)) END FROM Tweets""",
+            {'marker': self.reply_marker})
+        self.connection.commit()
+
+    def migrateGroupTables(self):
+        """
+        Copy the tweets of every per group table into the Tweets table and drop the old tables.  The old tables do not
+        store the id that a reply was made to, so migrated replies (recognised by the reply marker that the cleanser
+        puts in their text) get a replied_to_id of -1.
+        """
+        table_types = self.returnTableTypes()
+        old_tables = [group for group in self.groups if table_types.get(group) == 'table']
+        if not old_tables and table_types.get('OriginalTweets') != 'table':
+            return
+        with self.connection:
+            for group in old_tables:
+                logging.info("Migrating table %s into Tweets" % group)
+                self.connection.execute("""INSERT OR IGNORE INTO Tweets SELECT ?, day_key(day), id, user_id, datetime, day,
+                    full_text, CASE WHEN instr(full_text, ?) > 0 THEN -1 ELSE 0 END, retweets, sentiment FROM "%s" """ % group,
+                    (group, self.reply_marker))
+                self.connection.execute('DROP TABLE "%s"' % group)
+            #every original tweet is already in the table of its group
+            self.connection.execute("DROP TABLE IF EXISTS OriginalTweets")
+
+    def createGroupViews(self):
+        """
+        Create a read only view for each group, and one for the original tweets, with the names and columns of the
+        tables that were used before the Tweets table
+        """
+        table_types = self.returnTableTypes()
+        with self.connection:
+            if 'OriginalTweets' not in table_types:
+                self.connection.execute("""CREATE VIEW OriginalTweets AS SELECT id, user_id, datetime, day, full_text
+                    FROM Tweets WHERE replied_to_id = 0 GROUP BY id""")
+            for group in self.groups:
+                if group not in table_types:
+                    self.connection.execute("""CREATE VIEW "%s" AS SELECT %s FROM Tweets WHERE grp = '%s'"""
+                                            % (group, self.group_view_columns, group.replace("'", "''")))
+
+    def writeTweets(self, group, data):
+        """
+        Insert tweets for a group, ignoring any tweet that the group already has
+
+        ::param group: the group that the tweets belong to
+        ::param data: an iterable of rows in the order of tweet_column_names
+        """
+        insert_sql = "INSERT OR IGNORE INTO Tweets VALUES (%s)" % ','.join(['?'] * (len(self.tweet_column_names) + 1))
+        self.connection.executemany(insert_sql, ((group,) + tuple(row) for row in data))
+        self.connection.commit()
+
+    def writeParentText(self, data):
+        """
+        Add tweets to the ParentText table.  A tweet that is already there keeps its text
+
+        ::param data: an iterable of rows of (id, replied_to_id, full_text), with a replied_to_id of 0 for originals
+        """
+        self.connection.executemany("INSERT OR IGNORE INTO ParentText VALUES (?,?,?)", data)
+        self.connection.commit()
+
+    def returnThreadSQL(self, source, depth = 1):
+        """
+        Build the query that puts the text of the tweets that a reply answers in front of the text of the reply, going
+        up the thread through ParentText.  With a depth of 1 only the direct parent is added, giving
+        'parent || -> reply'; a depth of 2 gives 'grandparent || -> parent || -> reply' and so on, stopping early at
+        the top of the thread.  A reply whose parent is unknown gets ' ' as the text of the parent.
+
+        ::param source: the table of replies, with the columns id, replied_to_id and full_text (the own text)
+        ::param depth(Optional): the number of tweets above the reply to add
+        returns - a SELECT of (id, full_text) for every reply in the source
+        """
+        return """WITH RECURSIVE thread(reply_id, parent_id, full_text, depth) AS (
+                SELECT id, replied_to_id, full_text, 0 FROM %s WHERE replied_to_id <> 0
+                UNION ALL
+                SELECT t.reply_id, p.replied_to_id, p.full_text || '%s' || t.full_text, t.depth + 1
+                FROM thread t JOIN ParentText p ON p.id = t.parent_id WHERE t.depth < %i AND t.parent_id <> 0)
+            SELECT reply_id AS id, CASE WHEN MAX(depth) = 0 THEN ' %s' || full_text ELSE full_text END AS full_text
+            FROM thread GROUP BY reply_id""" % (source, self.reply_marker, int(depth), self.reply_marker)
+
+    def returnParentText(self, ids):
+        """
+        ::param ids: an iterable of the ids of tweets
+        returns - a dictionary of {id: (replied_to_id, full_text)} for the ids that are in the ParentText table
+        """
+        ids, parent_text = list(set(ids)), {}
+        #the ids are sent in chunks to stay under the limit of sqlite on the number of parameters
+        for n in range(0, len(ids), 900):
+            chunk = ids[n:n + 900]
+            parent_text.update((row[0], row[1:]) for row in self.connection.execute(
+                "SELECT id, replied_to_id, full_text FROM ParentText WHERE id IN (%s)" % ','.join(['?'] * len(chunk)), chunk))
+        return parent_text
+
+    def returnThreadText(self, replies, depth = 1):
+        """
+        Build the same text as returnThreadSQL for replies that are held in memory, looking up one level of the
+        threads of all of the replies at a time
+
+        ::param replies: an iterable of (replied_to_id, full_text) with the own text of each reply
+        ::param depth(Optional): the number of tweets above the reply to add
+        returns - a list of the full_text of the replies, in the order they were given
+        """
+        parent_ids, texts = [list(column) for column in zip(*replies)] or [[], []]
+        found_parent = [False] * len(texts)
+        for _ in range(int(depth)):
+            parent_text = self.returnParentText(parent_id for parent_id in parent_ids if parent_id != 0)
+            if not parent_text:
+                break
+            for n, parent_id in enumerate(parent_ids):
+                if parent_id in parent_text:
+                    parent_ids[n], parent_full_text = parent_text[parent_id]
+                    texts[n] = parent_full_text + self.reply_marker + texts[n]
+                    found_parent[n] = True
+                else:
+                    parent_ids[n] = 0
+        return [text if found else ' ' + self.reply_marker + text for text, found in zip(texts, found_parent)]
+
+    def deleteTweets(self, group):
+        """
+        ::param group: the group whose tweets are all removed ahead of a full load
+        """
+        self.connection.execute("DELETE FROM Tweets WHERE grp = ?", (group,))
+        self.connection.commit()
+
+    def recordLoadCompletion(self, stage, days = None):
+        """
+        Record that a load has finished writing, which tells the readers of the database that their cached results
+        are out of date
+
+        ::param stage: the stage that finished (cleanse, fused for a cleanse that scored its tweets, score)
+        ::param days(Optional): the days that the load wrote or scored.  None means every day
+        """
+        load_days = None if days is None else json.dumps(sorted(days, key = self.getDayKey))
+        self.connection.execute("INSERT INTO LoadLog (stage, completed, days) VALUES (?, ?, ?)",
+                                (stage, str(datetime.now()), load_days))
+        self.connection.commit()
+
+    def returnUnscoredDays(self):
+        """
+        Work out the days that have been cleansed and not scored since, by going through the loads in the LoadLog
+
+        returns - a sorted list of days, or None if every day has to be scored because a full cleanse has not been
+                  scored yet or no load has been recorded
+        """
+        unscored_days = None
+        for stage, days in self.connection.execute("SELECT stage, days FROM LoadLog ORDER BY load_id"):
+            days = None if days is None else set(json.loads(days))
+            if stage == 'cleanse':
+                unscored_days = None if days is None or unscored_days is None else unscored_days | days
+            elif stage in self.scoring_stages:
+                if days is None:
+                    unscored_days = set()
+                elif unscored_days is not None:
+                    unscored_days -= days
+        return None if unscored_days is None else sorted(unscored_days, key = self.getDayKey)
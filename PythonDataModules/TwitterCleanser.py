@@ -4,18 +4,23 @@ Twitter Cleanser to prepare the tweets for analysis
 Version 2: Added compression to all of the data as well as updated the reply process to have more
           optimal performance
 Version 3: Cleansed Text data into a sqlite database and re-arranged the raw data files into a new structure
+Version 3.1: All of the groups are written to the single Tweets table of the TweetStore instead of one table per group.
+             FULL loads read the monthly archives of the TwitterDataCompactor in place of the daily files they hold.
+             Replies are resolved through the ParentText index of the TweetStore, optionally several levels up the thread
 """
 
 #imports
 import sys
 from os import listdir, remove, rename
 from pathlib import Path
-from os.path import isdir, join, isfile
+from os.path import isdir, join
 import logging
 from collections import defaultdict
 import pandas as pd
 from pytz import timezone
-from datetime import datetime, date
+from datetime import datetime
+from PythonDataModules.TweetStore import TweetStore
+from PythonDataModules.TwitterDataCompactor import TwitterDataCompactor
 logging.basicConfig(stream=sys.stdout, level = logging.INFO)
 
 __author__ = "Dylan Smith"
@@ -30,31 +35,42 @@ __status__ = "Development"
 
 class TwitterCleanser(object):
     #constants
-    clean_column_names = ['id', 'user_id','datetime', 'day', 'full_text', 'retweets', 'sentiment']
-    original_column_names = ['id','user_id', 'datetime', 'day', 'full_text']
-    tmp_rply_column_names = ['id','user_id', 'datetime', 'day', 'full_text', 'replied_to_id', 'retweeted_id']
-    original_dfs, delta_dates_updt, reply_RT_dfs = [], [], defaultdict(list)
-    original_fields = "id BIGINT PRIMARY KEY, user_id TEXT, datetime TEXT, day TEXT, full_text TEXT"
-    table_fields = original_fields + ", retweets INT,  sentiment REAL"
-    tmp_rply_fields = original_fields + ", replied_to_id BIGINT, retweeted_id BIGINT"
+    clean_column_names = TweetStore.tweet_column_names
+    tmp_rply_column_names = ['id','user_id', 'datetime', 'day', 'day_key', 'full_text', 'replied_to_id', 'retweeted_id']
+    tmp_rply_fields = """id BIGINT PRIMARY KEY, user_id TEXT, datetime TEXT, day TEXT, day_key INT, full_text TEXT,
+        replied_to_id BIGINT, retweeted_id BIGINT"""
 
     #initialization
-    def __init__(self, proj_data_dir, db_connection, load_type):
+    def __init__(self, proj_data_dir, db_connection, load_type, sentiment_scorer = None, reply_depth = 1):
         """ Instantiates an instance of the Twython Cleanser.  Takes one input and sets up
             the correct connection
 
             ::param proj_data_dir: The directory where the Twitter data is dropped into
             ::param db_connection: a database connection to a sqlite database
             ::param load_type: What type of load will happen.  (FULL, DELTA)
+            ::param sentiment_scorer(Optional): a TwitterSentimentAnalyzer.  When it is given the cleanser runs in
+                    fused mode: each batch of cleansed tweets is scored and written once, with the hourly sentiment
+                    updated as it goes, instead of being written with a sentiment of 0 and re-scored afterwards.
+            ::param reply_depth(Optional): the number of tweets above a reply, up its thread, whose text is put in
+                    front of the text of the reply.  Defaults to the tweet it replied to
         """
+        if reply_depth < 1:
+            raise ValueError('reply_depth must be at least 1')
         #declare original properties
         self.load_type = load_type
+        self.sentiment_scorer = sentiment_scorer
+        self.reply_depth = reply_depth
         self.proj_data_dir = proj_data_dir
         self.connection = db_connection
         self.current_date = datetime.today().strftime('%Y%m%d')
+        #kept per instance so that a second cleanser in the same process does not inherit the previous load
+        self.delta_dates_updt, self.reply_RT_dfs = [], defaultdict(list)
         self.all_groups = [f for f in listdir(self.proj_data_dir) if isdir(join(self.proj_data_dir, f))]
-        self.executeSQLCommand("CREATE TABLE IF NOT EXISTS OriginalTweets (%s)" % self.original_fields)
-        self.executeSQLCommand("CREATE TABLE IF NOT EXISTS Tmp_Rply (%s)" % self.tmp_rply_fields)
+        self.tweet_store = TweetStore(self.connection, self.all_groups)
+        self.tweet_store.createTweetTables()
+        #Tmp_Rply only holds the replies of one group at a time so it is re-created in the current layout
+        self.executeSQLCommand("DROP TABLE IF EXISTS Tmp_Rply")
+        self.executeSQLCommand("CREATE TABLE Tmp_Rply (%s)" % self.tmp_rply_fields)
         self.executeSQLCommand("CREATE TABLE IF NOT EXISTS Retweets_To_Add (retweeted_id BIGINT PRIMARY KEY, count INT)")
 
     #Basic Methods
@@ -81,12 +97,10 @@ class TwitterCleanser(object):
         """
         Get the week number from the date
 
-        ::param x: A string as a date in the format YYYYMMDD
+        ::param x: A string as a date in the format of the day column (MonDDYYYY)
         returns - a week date for the year.
         """
-        month = int(self.calendar.index(x[:3])) + 1
-        dt = date(int(x[-4:]), month, int(x[3:5]))
-        return 'Week' + str(dt.isocalendar()[1]) + '|' + x[-4:]
+        return TweetStore.getWeekFromDayKey(TweetStore.getDayKey(x))
 
     def getDaysToUpdate(self):
         """
@@ -104,12 +118,11 @@ class TwitterCleanser(object):
         ::param column_struct: the column structure for the output of the data
         Take the cleansed data and write it to the correct table.
         """
-        if group == 'OriginalTweets':
-            field_len = 5
-        else:
-            field_len = 7
         data = tuple(dataframe[column_struct].itertuples(index = False))
-        wildcards = ','.join(['?'] * field_len)
+        if group in self.all_groups:
+            self.tweet_store.writeTweets(group, data)
+            return
+        wildcards = ','.join(['?'] * len(column_struct))
         insert_sql = """INSERT OR IGNORE INTO %s VALUES (%s)""" % (group, wildcards)
         self.executeSQLCommand(insert_sql, data)
 
@@ -124,6 +137,19 @@ class TwitterCleanser(object):
             self.connection.execute(sql_stmnt)
         self.connection.commit()
 
+    def formatRawTweets(self, data_DF):
+        """
+        ::param data_DF: the raw tweets of a daily file or an archive, with every column as text
+        returns - the dataframe with the line breaks taken out of the text, the datetime in central time and a 0 for
+                  the tweets that are not replies or retweets
+        """
+        data_DF['id'] = data_DF['id'].astype('int64')
+        data_DF['full_text'] = data_DF['full_text'].str.replace('\n', '').str.replace('\r', '')
+        data_DF['datetime'] = data_DF['datetime'].apply(self.convertToCentralTimeZone)
+        for column in ['replied_to_id', 'retweeted_id']:
+            data_DF[column] = data_DF[column].where(data_DF[column] != '', '0')
+        return data_DF
+
     def uploadTweetsIntoCleanser(self):
         """
         Upload the tweets into the cleanser and insert the original tweets for
@@ -133,51 +159,41 @@ class TwitterCleanser(object):
         logging.info("Going through Raw Tweets to Cleanse")
         for group in self.all_groups:
             logging.info("Going through tweets for team %s" % group)
-            self.executeSQLCommand("CREATE TABLE IF NOT EXISTS %s (%s)" % (group, self.table_fields))
 
             raw_data_dir = self.proj_data_dir.joinpath(group)
             #get the files to be loaded, and remove any potential files that could have duplicate dateata
             if self.load_type == 'FULL':
-                raw_data_files = [f for f in listdir(raw_data_dir) if isfile(join(raw_data_dir, f)) and f.split('.')[1] == 'csv']
-                self.executeSQLCommand('DELETE FROM %s' % group)
-                self.executeSQLCommand('DELETE FROM OriginalTweets')
+                raw_data_files = TwitterDataCompactor(self.proj_data_dir).returnRawDataFiles(group)
+                self.tweet_store.deleteTweets(group)
+                if self.sentiment_scorer is not None:
+                    self.sentiment_scorer.resetSentimentAggregates(group)
             else:
-                raw_data_files = [group + self.current_date + '.csv.gz']
+                raw_data_files = [raw_data_dir.joinpath(group + self.current_date + '.csv.gz')]
 
             for data_file in raw_data_files:
                 #get original tweets and re-format the date
-                data_DF = pd.read_csv(raw_data_dir.joinpath(data_file),
-                                    compression = 'gzip',
-                                    sep = '\t',
-                                    index_col = False,
-                                    encoding = 'utf-8',
-                                    names = ['id','user_id', 'datetime', 'full_text', 'replied_to_id', 'retweeted_id'],
-                                    converters = {'full_text':lambda x:x.replace('\n','').replace('\r',''),
-                                                   'datetime': lambda x: self.convertToCentralTimeZone(x),
-                                                   'replied_to_id': lambda x:  str(x) if x else '0',
-                                                   'retweeted_id': lambda x: str(x) if x else '0'},
-                                    lineterminator = '\n')
+                data_DF = self.formatRawTweets(TwitterDataCompactor.readRawTweetFile(data_file))
                 data_DF.loc[:, 'day'] = data_DF['datetime'].apply(self.getDateFromDateTime)
+                data_DF.loc[:, 'day_key'] = data_DF['day'].apply(TweetStore.getDayKey)
+
+                #every original and reply can be the parent of a later reply, from any group or load
+                parent_DF = data_DF.loc[data_DF['retweeted_id'] == '0', ['id', 'replied_to_id', 'full_text']]
+                self.tweet_store.writeParentText(zip(parent_DF['id'].tolist(), parent_DF['replied_to_id'].astype('int64').tolist(),
+                                                     parent_DF['full_text'].tolist()))
 
                 original_tweet_DF = data_DF.loc[(data_DF['replied_to_id'] == '0') & (data_DF['retweeted_id'] == '0')].copy()
-                self.original_dfs.append(original_tweet_DF)
                 self.reply_RT_dfs[group].append(data_DF.loc[(data_DF['replied_to_id'] != '0') | (data_DF['retweeted_id'] != '0')].copy())
                 #if it is an original load, load all of the tweets to the correct file
-                original_tweet_DF.loc[:, 'retweets'] = 0
-                original_tweet_DF.loc[:, 'sentiment'] = 0
+                original_tweet_DF['replied_to_id'] = 0
+                original_tweet_DF['retweets'] = 0
+                original_tweet_DF['sentiment'] = 0
 
                 self.delta_dates_updt += list(data_DF['day'].unique())
                 self.delta_dates_updt = list(set(self.delta_dates_updt))
-                self.writeCleansedTwitterData(original_tweet_DF, group, self.clean_column_names)
-
-    def updateOriginalTweets(self):
-        """
-        Cleanse the original Tweet data and position in the cleansed tweet data for each group.
-        Also store the original tweets in a central location of all the teams
-        """
-        logging.info("Writing Original Tweets to Central File")
-        for distinct_DF in self.original_dfs:
-            self.writeCleansedTwitterData(distinct_DF, 'OriginalTweets', self.original_column_names)
+                if self.sentiment_scorer is not None:
+                    self.sentiment_scorer.scoreAndWriteTweets(group, original_tweet_DF[self.clean_column_names].copy())
+                else:
+                    self.writeCleansedTwitterData(original_tweet_DF, group, self.clean_column_names)
 
     def cleanseRepliedTweets(self):
         """
@@ -188,17 +204,59 @@ class TwitterCleanser(object):
         logging.info("Going through Replied Data")
         for group in self.all_groups:
             self.executeSQLCommand("DELETE FROM Tmp_Rply")
-            for df in self.reply_RT_dfs[group]:
-                self.writeCleansedTwitterData(df, 'Tmp_Rply', self.tmp_rply_column_names)
-
-            #insert all the replied tweets to the table
-            join_data_sql = """INSERT OR IGNORE INTO %s SELECT a.id, a.user_id, a.datetime,
-                a.day, (ifnull(b.full_text, ' ') || ' || -> ' || a.full_text), 0 as retweets, 0 as sentiments
-                FROM Tmp_Rply a LEFT OUTER JOIN OriginalTweets b ON (a.replied_to_id = b.id) WHERE a.replied_to_id <> 0""" % group
-            self.executeSQLCommand(join_data_sql)
-            self.executeSQLCommand("INSERT INTO Retweets_To_Add SELECT retweeted_id, COUNT(retweeted_id) as Count FROM Tmp_Rply GROUP BY retweeted_id")
-            print("Summing Retweet values for %s" % group)
-            sum_sql = """UPDATE {0} SET Retweets = Retweets + (SELECT Count FROM Retweets_To_Add t1 WHERE {0}.id = t1.retweeted_id) \
-            WHERE EXISTS (SELECT * FROM Retweets_To_Add WHERE {0}.id = Retweets_To_Add.retweeted_id);""".format(group)
-            self.executeSQLCommand(sum_sql)
-            self.executeSQLCommand("DELETE FROM Retweets_To_Add")
+            if self.sentiment_scorer is not None:
+                #in fused mode the replies are scored from memory and only the retweets are staged, to be counted
+                self.scoreRepliedTweetsForGroup(group)
+                for df in self.reply_RT_dfs[group]:
+                    self.writeCleansedTwitterData(df.loc[df['retweeted_id'] != '0'], 'Tmp_Rply', self.tmp_rply_column_names)
+            else:
+                for df in self.reply_RT_dfs[group]:
+                    self.writeCleansedTwitterData(df, 'Tmp_Rply', self.tmp_rply_column_names)
+                self.joinRepliedTweetsForGroup(group)
+            self.addRetweetCountsForGroup(group)
+
+    def joinRepliedTweetsForGroup(self, group):
+        """
+        Add the text of the tweets above each reply that is staged in Tmp_Rply and insert the replies for the group.
+        The text comes from the ParentText index, so a parent can be an original or a reply from any group or earlier
+        load, and each reply costs one indexed lookup per level of reply_depth
+
+        ::param group: the group that the replies in Tmp_Rply belong to
+        """
+        join_data_sql = """SELECT a.day_key, a.id, a.user_id, a.datetime, a.day, b.full_text, a.replied_to_id,
+            0 as retweets, 0 as sentiment FROM Tmp_Rply a JOIN (%s) b ON b.id = a.id""" % \
+            self.tweet_store.returnThreadSQL('Tmp_Rply', self.reply_depth)
+        self.executeSQLCommand("INSERT OR IGNORE INTO Tweets SELECT ?, b.* FROM (%s) b" % join_data_sql, [(group,)])
+
+    def scoreRepliedTweetsForGroup(self, group):
+        """
+        Add the text of the tweets above each reply of the group from the ParentText index, as joinRepliedTweetsForGroup
+        does, then score the replies and write them in one pass.  This is used in fused mode so that the replies are
+        not staged in Tmp_Rply and read back before they are scored.
+
+        ::param group: the group that the replies belong to
+        """
+        if not self.reply_RT_dfs[group]:
+            return
+        reply_DF = pd.concat(self.reply_RT_dfs[group], ignore_index = True)
+        #the first copy of a reply is kept, as the staging table would keep it
+        reply_DF = reply_DF.loc[reply_DF['replied_to_id'] != '0'].drop_duplicates(subset = 'id').copy()
+        reply_DF['replied_to_id'] = reply_DF['replied_to_id'].astype('int64')
+        reply_DF['full_text'] = self.tweet_store.returnThreadText(zip(reply_DF['replied_to_id'].tolist(),
+                                                                      reply_DF['full_text'].tolist()), self.reply_depth)
+        reply_DF['retweets'] = 0
+        reply_DF['sentiment'] = 0
+        self.sentiment_scorer.scoreAndWriteTweets(group, reply_DF[self.clean_column_names].copy())
+
+    def addRetweetCountsForGroup(self, group):
+        """
+        Count the retweets that are staged in Tmp_Rply and add them to the retweet totals of the group
+
+        ::param group: the group that the retweets in Tmp_Rply belong to
+        """
+        self.executeSQLCommand("INSERT INTO Retweets_To_Add SELECT retweeted_id, COUNT(retweeted_id) as Count FROM Tmp_Rply GROUP BY retweeted_id")
+        print("Summing Retweet values for %s" % group)
+        sum_sql = """UPDATE Tweets SET retweets = retweets + (SELECT Count FROM Retweets_To_Add t1 WHERE Tweets.id = t1.retweeted_id) \
+        WHERE grp = ? AND id IN (SELECT retweeted_id FROM Retweets_To_Add);"""
+        self.executeSQLCommand(sum_sql, [(group,)])
+        self.executeSQLCommand("DELETE FROM Retweets_To_Add")
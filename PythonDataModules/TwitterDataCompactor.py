@@ -0,0 +1,245 @@
+##!/usr/bin/env python
+"""
+Twitter Data Compactor: Merges the daily raw tweet files of each group into one archive per month and applies the
+retention policy of the project to the raw data.
+
+The scraper appends every page of a search to the daily file of the group (<group>YYYYMMDD.csv.gz) as its own gzip
+member, so a FULL load opens and decompresses a growing pile of small files.  Once a month is over its daily files
+are merged into <group>/Archive/<group>YYYYMM.parquet with duplicate tweets removed.  The raw columns are kept as they
+were downloaded so the cleanser treats an archive exactly like the files it replaced.
+
+Every archive is checked before it is kept: it must hold every id of every file that went into it, and nothing else,
+once each.  The files that make up each archive are listed in Archive/Manifest.json, which is how the cleanser knows
+to read the archive instead of those files.  The retention policy then decides how long the archived daily files, and
+the archives themselves, are kept.
+
+Writing and reading the archives needs pyarrow (or fastparquet) for pandas.
+"""
+
+#imports
+import json
+import logging
+from datetime import datetime, timedelta
+from os import listdir, remove, replace
+from os.path import isfile, join
+import pandas as pd
+
+__author__ = "Dylan Smith"
+__copyright__ = "Copyright (C) 2018 Dylan Smith"
+__credits__ = ["Dylan Smith"]
+
+__license__ = "Personal Use"
+__version__ = "1.0"
+__maintainer__ = "Dylan Smith"
+__email__ = "-"
+__status__ = "Development"
+
+class TwitterDataCompactor(object):
+    #constants
+    raw_column_names = ['id', 'user_id', 'datetime', 'full_text', 'replied_to_id', 'retweeted_id']
+    archive_dir_name = 'Archive'
+    manifest_name = 'Manifest.json'
+
+    def __init__(self, proj_data_dir, raw_retention_days = 7, archive_retention_months = None):
+        """
+        ::param proj_data_dir: The directory where the Twitter data is dropped into (DataSources/Twitter/ProjectName)
+        ::param raw_retention_days(Optional): the days that a daily file is kept after it has been archived.  None
+                keeps the archived daily files
+        ::param archive_retention_months(Optional): the months that an archive is kept, counting back from the current
+                month.  None keeps every archive.  The tweets of a removed archive are no longer part of a FULL load
+        """
+        self.proj_data_dir = proj_data_dir
+        self.raw_retention_days = raw_retention_days
+        self.archive_retention_months = archive_retention_months
+        self.current_date = datetime.today()
+
+    #Basic Methods
+    @classmethod
+    def readRawTweetFile(cls, path):
+        """
+        Read a daily file or an archive with every column as the text that was downloaded
+
+        ::param path: the path of a <group>YYYYMMDD.csv.gz file or of an archive
+        returns - a dataframe with the raw_column_names
+        """
+        if path.suffix == '.parquet':
+            return pd.read_parquet(path)
+        return pd.read_csv(path,
+                           compression = 'gzip',
+                           sep = '\t',
+                           index_col = False,
+                           encoding = 'utf-8',
+                           names = cls.raw_column_names,
+                           dtype = str,
+                           keep_default_na = False,
+                           lineterminator = '\n')
+
+    def returnArchiveDir(self, group):
+        """
+        ::param group: the group of the archives
+        returns - the directory of the archives of the group
+        """
+        return self.proj_data_dir.joinpath(group, self.archive_dir_name)
+
+    def returnManifest(self, group):
+        """
+        ::param group: the group of the archives
+        returns - a dictionary of {archive name: {'month', 'files', 'source_rows', 'rows', 'compacted'}}
+        """
+        manifest_path = self.returnArchiveDir(group).joinpath(self.manifest_name)
+        if not manifest_path.exists():
+            return {}
+        with open(manifest_path, 'r') as file:
+            return json.load(file)
+
+    def writeManifest(self, group, manifest):
+        """
+        ::param group: the group of the archives
+        ::param manifest: the manifest to write in place of the current one
+        """
+        manifest_path = self.returnArchiveDir(group).joinpath(self.manifest_name)
+        tmp_path = manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as file:
+            json.dump(manifest, file, indent = 2, sort_keys = True)
+        replace(str(tmp_path), str(manifest_path))
+
+    def returnDailyFiles(self, group):
+        """
+        ::param group: the group of the files
+        returns - a sorted list of the names of the raw data files in the directory of the group
+        """
+        raw_data_dir = self.proj_data_dir.joinpath(group)
+        return sorted(f for f in listdir(raw_data_dir) if isfile(join(raw_data_dir, f)) and f.split('.')[1] == 'csv')
+
+    def returnFileDate(self, group, file_name):
+        """
+        ::param group: the group of the file
+        ::param file_name: the name of a raw data file
+        returns - the date of a <group>YYYYMMDD.csv.gz file, or None for any other file
+        """
+        try:
+            return datetime.strptime(file_name[len(group):len(group) + 8], '%Y%m%d') if file_name.startswith(group) else None
+        except ValueError:
+            return None
+
+    def returnRawDataFiles(self, group):
+        """
+        Return what a FULL load has to read for a group: every archive and the daily files that are in none of them
+
+        ::param group: the group to load
+        returns - a list of paths
+        """
+        manifest = self.returnManifest(group)
+        archived_files = set(f for entry in manifest.values() for f in entry['files'])
+        archive_dir = self.returnArchiveDir(group)
+        archives = [archive_dir.joinpath(name) for name in sorted(manifest)]
+        daily_files = [self.proj_data_dir.joinpath(group, f) for f in self.returnDailyFiles(group) if f not in archived_files]
+        return archives + daily_files
+
+    def compactAllGroups(self):
+        """
+        Compact every group in the project and apply the retention policy
+        """
+        for group in sorted(f for f in listdir(self.proj_data_dir) if self.proj_data_dir.joinpath(f).is_dir()):
+            self.compactGroup(group)
+            self.applyRetentionPolicy(group)
+
+    def compactGroup(self, group):
+        """
+        Archive the daily files of every month before the current one that are not archived yet.  A month that already
+        has an archive is merged with its new files.
+
+        ::param group: the group to compact
+        """
+        manifest = self.returnManifest(group)
+        archived_files = set(f for entry in manifest.values() for f in entry['files'])
+        current_month = self.current_date.strftime('%Y%m')
+        months = {}
+        for f in self.returnDailyFiles(group):
+            file_date = self.returnFileDate(group, f)
+            if f not in archived_files and file_date is not None and file_date.strftime('%Y%m') < current_month:
+                months.setdefault(file_date.strftime('%Y%m'), []).append(f)
+        if not months:
+            return
+        self.returnArchiveDir(group).mkdir(exist_ok = True)
+        for month, files in sorted(months.items()):
+            archive_name = '%s%s.parquet' % (group, month)
+            manifest[archive_name] = self.compactMonth(group, archive_name, files, manifest.get(archive_name))
+            self.writeManifest(group, manifest)
+            logging.info('-- Compacted %i files of %s into %s --' % (len(files), group, archive_name))
+
+    def compactMonth(self, group, archive_name, files, entry = None):
+        """
+        Write the archive of a month and check it against the files that went into it
+
+        ::param group: the group of the files
+        ::param archive_name: the file name of the archive
+        ::param files: the names of the daily files to add to the archive
+        ::param entry(Optional): the manifest entry of the archive, if the month already has one
+        returns - the manifest entry of the new archive
+        """
+        archive_path = self.returnArchiveDir(group).joinpath(archive_name)
+        sources = [self.readRawTweetFile(self.proj_data_dir.joinpath(group, f)) for f in files]
+        source_rows = sum(len(df) for df in sources)
+        if entry is not None:
+            sources.insert(0, self.readRawTweetFile(archive_path))
+            source_rows += entry['source_rows']
+        source_DF = pd.concat(sources, ignore_index = True)
+        archive_DF = source_DF.drop_duplicates(subset = 'id', keep = 'first')
+
+        tmp_path = archive_path.with_suffix('.tmp')
+        archive_DF.to_parquet(tmp_path, index = False)
+        try:
+            self.verifyArchive(tmp_path, source_DF)
+        except ValueError:
+            remove(str(tmp_path))
+            raise
+        replace(str(tmp_path), str(archive_path))
+        return {'month': archive_name[len(group):len(group) + 6],
+                'files': sorted((entry or {}).get('files', []) + files),
+                'source_rows': source_rows,
+                'rows': len(archive_DF),
+                'compacted': str(datetime.now())}
+
+    def verifyArchive(self, archive_path, source_DF):
+        """
+        Check that a written archive holds every tweet of its sources exactly once
+
+        ::param archive_path: the path of the archive to check
+        ::param source_DF: every row of the files (and the earlier archive) that went into the archive
+        """
+        archive_ids = pd.read_parquet(archive_path, columns = ['id'])['id']
+        source_ids = source_DF['id'].unique()
+        if len(archive_ids) != len(source_ids) or archive_ids.duplicated().any() or not archive_ids.isin(source_ids).all():
+            raise ValueError('%s has %i rows but its sources have %i distinct tweets'
+                             % (archive_path.name, len(archive_ids), len(source_ids)))
+
+    def applyRetentionPolicy(self, group):
+        """
+        Remove the archived daily files that are older than raw_retention_days and the archives that are older than
+        archive_retention_months
+
+        ::param group: the group to apply the policy to
+        """
+        manifest = self.returnManifest(group)
+        if self.raw_retention_days is not None:
+            cutoff = self.current_date - timedelta(days = self.raw_retention_days)
+            archived_files = set(f for entry in manifest.values() for f in entry['files'])
+            for f in self.returnDailyFiles(group):
+                file_date = self.returnFileDate(group, f)
+                if f in archived_files and file_date is not None and file_date < cutoff:
+                    remove(str(self.proj_data_dir.joinpath(group, f)))
+                    logging.info('Removed archived file %s' % f)
+        if self.archive_retention_months is not None:
+            months = self.current_date.year * 12 + self.current_date.month - 1 - self.archive_retention_months
+            oldest_month = '%04i%02i' % (months // 12, months % 12 + 1)
+            expired = [archive_name for archive_name, entry in sorted(manifest.items()) if entry['month'] < oldest_month]
+            for archive_name in expired:
+                logging.info('Removing archive %s under the retention policy' % archive_name)
+                #the daily files of the archive go with it, or the next FULL load would read them again
+                for f in manifest[archive_name]['files'] + [join(self.archive_dir_name, archive_name)]:
+                    if self.proj_data_dir.joinpath(group, f).exists():
+                        remove(str(self.proj_data_dir.joinpath(group, f)))
+                del manifest[archive_name]
+            if expired:
+                self.writeManifest(group, manifest)
@@ -11,6 +11,8 @@ from pathlib import Path
 import logging
 import pandas as pd
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from PythonDataModules.TweetStore import TweetStore
+from PythonDataModules.SentimentAggregates import SentimentAggregates
 logging.basicConfig(stream=sys.stdout, level = logging.INFO)
 
 __author__ = "Dylan Smith"
@@ -24,6 +26,9 @@ __email__ = "-"
 __status__ = "Development"
 
 class TwitterSentimentAnalyzer(object):
+    #constants
+    tmp_scored_fields = TweetStore.tweet_fields + ", PRIMARY KEY (grp, id)"
+
     def __init__(self, proj_data_dir, proj_analysis_dir, db_connection, days_to_update):
         """ Instantiates an instance of the Twython Cleanser.
 
@@ -37,6 +42,14 @@ class TwitterSentimentAnalyzer(object):
         self.analytics_file = proj_analysis_dir.joinpath('CalculatedSentimentData.csv')
         self.record_counts_file = proj_analysis_dir.joinpath('RecordCounts.csv')
         self.all_groups = [f for f in listdir(proj_data_dir) if isdir(join(proj_data_dir, f))]
+        self.sentiment_analyzer = SentimentIntensityAnalyzer()
+        TweetStore(self.db_con, self.all_groups).createTweetTables()
+        #running totals of the sentiment per group and hour so the hourly and daily means can be updated incrementally
+        self.sentiment_aggregates = SentimentAggregates(self.db_con)
+        self.sentiment_aggregates.createAggregateTables()
+        self.db_con.execute("DROP TABLE IF EXISTS Tmp_Scored")
+        self.db_con.execute("CREATE TABLE Tmp_Scored (%s)" % self.tmp_scored_fields)
+        self.db_con.commit()
 
     #Basic Methods
     def returnSentimentForTweet(self, tweet):
@@ -44,8 +57,36 @@ class TwitterSentimentAnalyzer(object):
         ::param tweet: Takes a string input and from the tweet.
         return: The sentiment for the string of each tweet
         """
-        return SentimentIntensityAnalyzer().polarity_scores(tweet)['compound']
+        return self.sentiment_analyzer.polarity_scores(tweet)['compound']
+
+    def resetSentimentAggregates(self, group):
+        """
+        Clear the sentiment totals of a group before all of its tweets are reloaded
+
+        ::param group: the group whose totals are cleared
+        """
+        self.sentiment_aggregates.resetGroup(group)
+
+    def scoreAndWriteTweets(self, group, cleansed_data_DF):
+        """
+        Score a batch of cleansed tweets and write them to the Tweets table in one pass.  The hourly totals are
+        only increased by the tweets that the group does not already have, so a batch can be re-sent safely.  This is
+        used by the TwitterCleanser when it runs in fused mode.
 
+        ::param group: the group that the tweets belong to
+        ::param cleansed_data_DF: a dataframe of tweets in the column structure of TweetStore.tweet_column_names
+        """
+        if cleansed_data_DF.empty:
+            return
+        cleansed_data_DF['sentiment'] = cleansed_data_DF['full_text'].apply(self.returnSentimentForTweet)
+        data = [(group,) + tuple(row) for row in cleansed_data_DF[TweetStore.tweet_column_names].itertuples(index = False)]
+        wildcards = ','.join(['?'] * (len(TweetStore.tweet_column_names) + 1))
+        self.db_con.execute("DELETE FROM Tmp_Scored")
+        self.db_con.executemany("INSERT OR IGNORE INTO Tmp_Scored VALUES (%s)" % wildcards, data)
+        self.sentiment_aggregates.mergeNewTweets('Tmp_Scored')
+        self.db_con.execute("INSERT OR IGNORE INTO Tweets SELECT * FROM Tmp_Scored")
+        self.db_con.execute("DELETE FROM Tmp_Scored")
+        self.db_con.commit()
 
     def calculateSentimentForTweets(self):
         """
@@ -53,6 +94,41 @@ class TwitterSentimentAnalyzer(object):
         re-writes the data back into a cleansed data file.  This is dependent on the previous tweets being loaded into
         the cleanser and the specific dates that will be updated with sentiment values as well as the record counts
         """
+        days_updated, full_run = set(), self.load_days is None
+        #get the days to be scored, across all of the groups at once
+        if full_run:
+            self.load_days = pd.read_sql_query("""SELECT DISTINCT day FROM Tweets""", self.db_con)['day'].tolist()
+            for group in self.all_groups:
+                self.resetSentimentAggregates(group)
+
+        #each day is read and scored for every group at once, so a day is one read and one update however many groups
+        #there are
+        group_wildcards = ','.join(['?'] * len(self.all_groups))
+        select_sql = """SELECT grp, id, day, full_text FROM Tweets WHERE grp IN (%s) AND day_key = ?""" % group_wildcards
+        update_sql = """UPDATE Tweets SET sentiment = ? WHERE grp = ? AND day_key = ? AND id = ?"""
+        for date in self.load_days:
+            logging.info("Calculating Sentiment For %s" % date)
+            day_key = TweetStore.getDayKey(date)
+            cleansed_data_DF = pd.read_sql_query(select_sql, self.db_con, params = tuple(self.all_groups) + (day_key,))
+            cleansed_data_DF.loc[:,'sentiment'] = cleansed_data_DF['full_text'].apply(self.returnSentimentForTweet)
+
+            data = [(sentiment, group, day_key, tweet_id) for group, tweet_id, sentiment in
+                    zip(cleansed_data_DF['grp'].tolist(), cleansed_data_DF['id'].tolist(), cleansed_data_DF['sentiment'].tolist())]
+            self.db_con.executemany(update_sql, data)
+            #the day was re-scored in full so its totals replace what was there before
+            self.sentiment_aggregates.replaceDayForGroups(self.all_groups, day_key)
+            self.db_con.commit()
+            days_updated.update(cleansed_data_DF['day'].unique())
+
+        self.updateAnalyticsFiles(days_updated)
+
+    def updateAnalyticsFiles(self, days_to_update = None):
+        """
+        Write the daily sentiment and record counts of every group to the aggregated sentiment files.  The values come
+        from the running totals in the DailySentiment view so no tweets are read.
+
+        ::param days_to_update(Optional): the days to write.  If no days are specified then every day is written
+        """
         #ingest the total sentiment summation file into a dataframe, pull down the record count file as well
         total_sentiment_DF = pd.read_csv(self.analytics_file,
                                         encoding = 'utf-8',
@@ -61,38 +137,22 @@ class TwitterSentimentAnalyzer(object):
         total_record_counts_DF = pd.read_csv(self.record_counts_file,
                                              encoding = 'utf-8',
                                              header = 0)
-
-        for group in self.all_groups:
-            logging.info("Calculating Sentiment For %s" % group)
-
-            #get the files to be loaded, and remove any potential files that could have duplicate dateata
-            if self.load_days is None:
-                self.load_days = pd.read_sql_query("""SELECT DISTINCT day FROM %s""" % group, self.db_con)['day'].tolist()
-
-            for date in self.load_days:
-                cleansed_data_DF = pd.read_sql_query("""SELECT * FROM %s WHERE day = \"%s\"""" %(group, date), self.db_con)
-                cleansed_data_DF.loc[:,'sentiment'] = cleansed_data_DF['full_text'].apply(self.returnSentimentForTweet)
-                self.db_con.execute("DELETE FROM %s WHERE day = \"%s\"""" %(group, date))
-                self.db_con.commit()
-
-                data = tuple(cleansed_data_DF.itertuples(index = False))
-                wildcards = ','.join(['?'] * 7)
-                insert_sql = """INSERT OR IGNORE INTO %s VALUES (%s)""" % (group, wildcards)
-                self.db_con.executemany(insert_sql, data)
-                self.db_con.commit()
-
-                #update the aggregated sentiment file for the dates specified
-                for date_to_add in cleansed_data_DF['day'].unique():
-                    if date_to_add not in total_record_counts_DF['Date'].tolist():
-                        new_record = len(total_record_counts_DF['Date'])
-                        total_sentiment_DF.loc[new_record] = [date_to_add] + [0 for group in self.all_groups]
-                        total_record_counts_DF.loc[new_record] = [date_to_add] + [0 for group in self.all_groups]
-
-                    #add the records to the data counts
-                    total_sentiment_DF.loc[total_sentiment_DF['Date'] == date_to_add, group] = \
-                                                    cleansed_data_DF[cleansed_data_DF['day'] == date_to_add]['sentiment'].mean()
-                    total_record_counts_DF.loc[total_record_counts_DF['Date'] == date_to_add , group] = \
-                                                        cleansed_data_DF[cleansed_data_DF['day'] == date_to_add].shape[0]
+        #a column of whole numbers (or an empty file) is read as integers, which cannot hold a mean
+        total_sentiment_DF = total_sentiment_DF.astype({col: float for col in total_sentiment_DF.columns if col != 'Date'})
+
+        daily_sentiment_DF = pd.read_sql_query("SELECT grp, day, sentiment_sum, tweet_count FROM DailySentiment", self.db_con)
+        if days_to_update is not None:
+            daily_sentiment_DF = daily_sentiment_DF[daily_sentiment_DF['day'].isin(list(days_to_update))]
+
+        for group, date_to_add, sentiment_sum, tweet_count in daily_sentiment_DF.itertuples(index = False):
+            if date_to_add not in total_record_counts_DF['Date'].tolist():
+                new_record = len(total_record_counts_DF['Date'])
+                total_sentiment_DF.loc[new_record] = [date_to_add] + [0.0 for group in self.all_groups]
+                total_record_counts_DF.loc[new_record] = [date_to_add] + [0 for group in self.all_groups]
+
+            #add the records to the data counts
+            total_sentiment_DF.loc[total_sentiment_DF['Date'] == date_to_add, group] = sentiment_sum / tweet_count
+            total_record_counts_DF.loc[total_record_counts_DF['Date'] == date_to_add , group] = tweet_count
 
         #once all the groups have been iterated through, write the dataframe to file again
         total_sentiment_DF.to_csv(self.analytics_file,
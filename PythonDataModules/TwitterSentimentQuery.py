@@ -0,0 +1,176 @@
+##!/usr/bin/env python
+"""
+Twitter Sentiment Query: Read only access to the sentiment of a project for dashboards and ad-hoc analysis, so that
+they do not need to read CalculatedSentimentData.csv or run their own SQL against CleansedData.db while a load is
+writing to it.
+
+The question that is answered is "what was the sentiment and tweet count for groups G between days R at a granularity
+of day or week".  Every thread gets its own read only connection and results are kept in a ResultCache against the
+latest load in the LoadLog table, so they are out of date as soon as a new load is recorded (see
+TweetStore.recordLoadCompletion).
+
+The queries can also be served over http on the local machine:
+    GET /sentiment?groups=Bears,Lions&start=20181001&end=20181031&granularity=week
+"""
+
+#imports
+import json
+import logging
+import sqlite3 as db
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+from PythonDataModules.ResultCache import ResultCache
+from PythonDataModules.SentimentAggregates import SentimentAggregates
+from PythonDataModules.TweetStore import TweetStore
+
+__author__ = "Dylan Smith"
+__copyright__ = "Copyright (C) 2018 Dylan Smith"
+__credits__ = ["Dylan Smith"]
+
+__license__ = "Personal Use"
+__version__ = "1.0"
+__maintainer__ = "Dylan Smith"
+__email__ = "-"
+__status__ = "Development"
+
+class TwitterSentimentQuery(object):
+    #constants
+    granularities = ['day', 'week']
+
+    def __init__(self, db_path, cache_size = 256):
+        """
+        ::param db_path: the path of the CleansedData.db of the project
+        ::param cache_size(Optional): the number of results to keep in the cache.  0 turns the cache off
+        """
+        self.db_uri = Path(db_path).resolve().as_uri() + '?mode=ro'
+        self.result_cache = ResultCache(cache_size)
+        self.local = threading.local()
+
+    #Basic Methods
+    def returnConnection(self):
+        """
+        returns - the read only connection of the current thread, opened the first time the thread asks for it
+        """
+        if getattr(self.local, 'connection', None) is None:
+            self.local.connection = db.connect(self.db_uri, uri = True)
+            self.local.connection.execute("PRAGMA query_only = 1")
+        return self.local.connection
+
+    def returnDataVersion(self):
+        """
+        returns - the id of the last completed load, or 0 if no load has been recorded yet
+        """
+        try:
+            return self.returnConnection().execute("SELECT MAX(load_id) FROM LoadLog").fetchone()[0] or 0
+        except db.OperationalError:
+            return 0
+
+    def returnDayKey(self, day):
+        """
+        ::param day: a day as an integer or string YYYYMMDD, or in the format of the day column (e.g. Oct102018)
+        returns - the day as an integer in the format YYYYMMDD
+        """
+        if isinstance(day, int) or str(day).isdigit():
+            return int(day)
+        return TweetStore.getDayKey(day)
+
+    def getSentiment(self, groups, start_day, end_day, granularity = 'day'):
+        """
+        Return the mean sentiment and the count of the scored tweets of each group for every day or week in a date
+        range.  Periods without scored tweets are left out.
+
+        ::param groups: a list of the groups to return
+        ::param start_day: the first day of the range (inclusive)
+        ::param end_day: the last day of the range (inclusive)
+        ::param granularity(Optional): 'day' or 'week'
+        returns - a list of dictionaries {group, period, sentiment, count} ordered by group and period.  The period is
+                  the day as YYYYMMDD or the week as WeekNN|YYYY
+        """
+        if granularity not in self.granularities:
+            raise ValueError('granularity must be one of %s' % ', '.join(self.granularities))
+        key = (tuple(sorted(set(groups))), self.returnDayKey(start_day), self.returnDayKey(end_day), granularity)
+        return self.result_cache.returnResult(key, self.returnDataVersion(), lambda: self.querySentiment(*key))
+
+    def querySentiment(self, groups, start_key, end_key, granularity):
+        """
+        Run the query for getSentiment against the database.  The daily totals of the scored tweets are read from the
+        hourly buckets (see SentimentAggregates.returnDailyTotalsSQL), then rolled up to weeks if they were asked for.
+
+        ::param groups: a tuple of the groups to return
+        ::param start_key: the first day of the range as YYYYMMDD
+        ::param end_key: the last day of the range as YYYYMMDD
+        ::param granularity: 'day' or 'week'
+        """
+        if not groups:
+            return []
+        connection = self.returnConnection()
+        daily_sql = SentimentAggregates(connection).returnDailyTotalsSQL(TweetStore(connection, groups), groups)
+        if daily_sql is None:
+            return []
+        totals = OrderedDict()
+        for group, day_key, _, sentiment_sum, count in connection.execute(daily_sql + " ORDER BY 1, 2", groups + (start_key, end_key)):
+            period = day_key if granularity == 'day' else TweetStore.getWeekFromDayKey(day_key)
+            period_totals = totals.setdefault((group, period), [0.0, 0])
+            period_totals[0] += sentiment_sum
+            period_totals[1] += count
+        return [{'group': group, 'period': period, 'sentiment': sentiment_sum / count, 'count': count}
+                for (group, period), (sentiment_sum, count) in totals.items()]
+
+    def serveSentimentQueries(self, host = '127.0.0.1', port = 8050):
+        """
+        Serve getSentiment over http until the process is stopped.  Each request is handled on its own thread.
+
+        ::param host(Optional): the address to listen on.  Defaults to the local machine only
+        ::param port(Optional): the port to listen on
+        """
+        server = ThreadingHTTPServer((host, port), SentimentRequestHandler)
+        server.sentiment_query = self
+        logging.info('-- Serving sentiment queries on http://%s:%i/sentiment --' % (host, port))
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+class SentimentRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        """
+        Answer GET /sentiment?groups=G1,G2&start=YYYYMMDD&end=YYYYMMDD[&granularity=day|week] with json
+        """
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if url.path != '/sentiment':
+            return self.sendJSON(404, {'error': 'unknown path %s' % url.path})
+        try:
+            results = self.server.sentiment_query.getSentiment([g for g in params['groups'].split(',') if g],
+                                                               params['start'], params['end'],
+                                                               params.get('granularity', 'day'))
+        except KeyError as e:
+            return self.sendJSON(400, {'error': 'missing parameter %s' % e})
+        except ValueError as e:
+            return self.sendJSON(400, {'error': str(e)})
+        except db.Error as e:
+            logging.error('Sentiment query failed: %s' % e)
+            return self.sendJSON(503, {'error': 'the sentiment database can not be read: %s' % e})
+        self.sendJSON(200, {'results': results})
+
+    def sendJSON(self, status, payload):
+        """
+        ::param status: the http status code
+        ::param payload: the object to send back as json
+        """
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(format % args)
@@ -0,0 +1,64 @@
+##!/usr/bin/env python
+"""
+Legacy Project: Builds projects for the tests, either empty or with a CleansedData.db in the layout that was used
+before the Tweets table (one table per group plus OriginalTweets), and writes raw tweet files the way the
+TwitterScraper does.
+"""
+
+#imports
+import gzip
+import sqlite3 as db
+from Benchmarks.SyntheticTweetGenerator import SyntheticTweetGenerator
+
+__author__ = "Dylan Smith"
+__copyright__ = "Copyright (C) 2018 Dylan Smith"
+__credits__ = ["Dylan Smith"]
+
+__license__ = "Personal Use"
+__version__ = "1.0"
+__maintainer__ = "Dylan Smith"
+__email__ = "-"
+__status__ = "Development"
+
+#the layout of the group tables and OriginalTweets before the Tweets table
+original_fields = "id BIGINT PRIMARY KEY, user_id TEXT, datetime TEXT, day TEXT, full_text TEXT"
+table_fields = original_fields + ", retweets INT,  sentiment REAL"
+reply_marker = ' || -> '
+
+def createProject(root_dir, groups):
+    """
+    ::param root_dir: the folder to create the project in
+    ::param groups: the groups of the project
+    returns - a tuple of (proj_data_dir, proj_analysis_dir) for the project area 'Area' and project name 'Project'
+    """
+    return SyntheticTweetGenerator().createProject(root_dir, 'Area', 'Project', groups)
+
+def createLegacyDatabase(db_path, tweets):
+    """
+    Write tweets into a database in the layout from before the Tweets table
+
+    ::param db_path: the path of the CleansedData.db to create
+    ::param tweets: a list of (group, id, day, full_text, parent text or None, sentiment).  Replies are stored with
+                    the text of their parent in front of their own text, as the old cleanser did
+    """
+    connection = db.connect(str(db_path))
+    connection.execute("CREATE TABLE OriginalTweets (%s)" % original_fields)
+    for group in set(tweet[0] for tweet in tweets):
+        connection.execute("CREATE TABLE %s (%s)" % (group, table_fields))
+    for group, tweet_id, day, full_text, parent_text, sentiment in tweets:
+        datetime = 'Sun %s %s 12:00:00 -0500 %s' % (day[:3], day[3:5], day[-4:])
+        if parent_text is None:
+            connection.execute("INSERT INTO OriginalTweets VALUES (?,?,?,?,?)", (tweet_id, 'fan', datetime, day, full_text))
+        else:
+            full_text = parent_text + reply_marker + full_text
+        connection.execute("INSERT INTO %s VALUES (?,?,?,?,?,?,?)" % group, (tweet_id, 'fan', datetime, day, full_text, 0, sentiment))
+    connection.commit()
+    connection.close()
+
+def writeRawTweets(raw_file, rows):
+    """
+    ::param raw_file: the path of the <group>YYYYMMDD.csv.gz file to write
+    ::param rows: a list of (id, user_id, created_at, full_text, replied_to_id, retweeted_id) with '' for no id
+    """
+    with gzip.open(str(raw_file), 'ab') as file:
+        file.write(''.join('\t'.join(str(value) for value in row) + '\n' for row in rows).encode('utf-8'))
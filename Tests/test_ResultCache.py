@@ -0,0 +1,89 @@
+##!/usr/bin/env python
+"""
+Tests for the ResultCache and the readers that cache their results in it
+"""
+
+#imports
+import shutil
+import sqlite3 as db
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+from PythonDataModules.ResultCache import ResultCache
+from PythonDataModules.SentimentAggregates import SentimentAggregates
+from PythonDataModules.SentimentPriceAnalytics import SentimentPriceAnalytics
+from PythonDataModules.TweetStore import TweetStore
+from PythonDataModules.TwitterSentimentQuery import TwitterSentimentQuery
+
+__author__ = "Dylan Smith"
+__copyright__ = "Copyright (C) 2018 Dylan Smith"
+__credits__ = ["Dylan Smith"]
+
+__license__ = "Personal Use"
+__version__ = "1.0"
+__maintainer__ = "Dylan Smith"
+__email__ = "-"
+__status__ = "Development"
+
+class ResultCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+    def calculate(self, value):
+        return lambda: self.calls.append(value) or value
+
+    def test_versions_and_eviction(self):
+        result_cache = ResultCache(cache_size = 2)
+        self.assertEqual(result_cache.returnResult('a', 1, self.calculate('a1')), 'a1')
+        self.assertEqual(result_cache.returnResult('a', 1, self.calculate('a1 again')), 'a1')
+        self.assertEqual(result_cache.returnResult('a', 2, self.calculate('a2')), 'a2')
+        #'a' at version 1 is the least recently used once 'b' is added
+        self.assertEqual(result_cache.returnResult('b', 2, self.calculate('b2')), 'b2')
+        self.assertEqual(result_cache.returnResult('a', 1, self.calculate('a1 evicted')), 'a1 evicted')
+        self.assertEqual(self.calls, ['a1', 'a2', 'b2', 'a1 evicted'])
+
+    def test_cache_off(self):
+        result_cache = ResultCache(cache_size = 0)
+        result_cache.returnResult('a', 1, self.calculate('a1'))
+        result_cache.returnResult('a', 1, self.calculate('a1'))
+        self.assertEqual(self.calls, ['a1', 'a1'])
+
+class CachedReaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root_dir = Path(tempfile.mkdtemp(prefix = 'twtr_test_'))
+        self.db_path = self.root_dir.joinpath('CleansedData.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.root_dir, ignore_errors = True)
+
+    def test_query_sees_new_load(self):
+        connection = db.connect(str(self.db_path))
+        tweet_store = TweetStore(connection, ['Bears'])
+        tweet_store.createTweetTables()
+        sentiment_aggregates = SentimentAggregates(connection)
+        sentiment_aggregates.createAggregateTables()
+        tweet_store.writeTweets('Bears', [(20181010, 1, 'fan', '', 'Oct102018', 'one', 0, 0, 0.5)])
+        sentiment_aggregates.replaceDay('Bears', 20181010)
+        tweet_store.recordLoadCompletion('score')
+        sentiment_query = TwitterSentimentQuery(self.db_path)
+        self.assertEqual([row['count'] for row in sentiment_query.getSentiment(['Bears'], 20181001, 20181031)], [1])
+
+        tweet_store.writeTweets('Bears', [(20181010, 2, 'fan', '', 'Oct102018', 'two', 0, 0, 0.5)])
+        sentiment_aggregates.replaceDay('Bears', 20181010)
+        connection.commit()
+        self.assertEqual([row['count'] for row in sentiment_query.getSentiment(['Bears'], 20181001, 20181031)], [1])
+        tweet_store.recordLoadCompletion('score')
+        self.assertEqual([row['count'] for row in sentiment_query.getSentiment(['Bears'], 20181001, 20181031)], [2])
+        connection.close()
+
+    def test_analytics_without_data(self):
+        analytics = SentimentPriceAnalytics(db.connect(':memory:'), db.connect(':memory:'))
+        self.assertEqual(analytics.returnDataVersions([]), (0, ()))
+        with self.assertRaises(ValueError):
+            analytics.getAlignedSeries(['Bears'], ['SYM'], date(2018, 10, 1), date(2018, 10, 31))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+##!/usr/bin/env python
+"""
+Tests for the hourly sentiment buckets of SentimentAggregates: creating them for databases that already had tweets,
+keeping them up to date as tweets are scored, and the rolling windows that are calculated from them
+"""
+
+#imports
+import shutil
+import sqlite3 as db
+import tempfile
+import unittest
+from datetime import date, timedelta
+from pathlib import Path
+import numpy as np
+from LegacyProject import createLegacyDatabase
+from PythonDataModules.SentimentAggregates import SentimentAggregates
+from PythonDataModules.TweetStore import TweetStore
+
+__author__ = "Dylan Smith"
+__copyright__ = "Copyright (C) 2018 Dylan Smith"
+__credits__ = ["Dylan Smith"]
+
+__license__ = "Personal Use"
+__version__ = "1.0"
+__maintainer__ = "Dylan Smith"
+__email__ = "-"
+__status__ = "Development"
+
+class AggregateCreationTest(unittest.TestCase):
+    groups = ['Bears', 'Packers']
+
+    def setUp(self):
+        self.root_dir = Path(tempfile.mkdtemp(prefix = 'twtr_test_'))
+        self.db_path = self.root_dir.joinpath('CleansedData.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.root_dir, ignore_errors = True)
+
+    def returnDailySentiment(self, connection):
+        return connection.execute("SELECT grp, day, sentiment_sum, tweet_count FROM DailySentiment ORDER BY grp, day").fetchall()
+
+    def test_buckets_built_for_migrated_database(self):
+        createLegacyDatabase(self.db_path, [('Bears', 1, 'Oct102018', 'one', None, 0.5),
+                                            ('Bears', 2, 'Oct102018', 'two', None, 0.25),
+                                            ('Packers', 3, 'Oct112018', 'three', 'one', -0.5)])
+        connection = db.connect(str(self.db_path))
+        TweetStore(connection, self.groups).createTweetTables()
+        SentimentAggregates(connection).createAggregateTables()
+        expected = [('Bears', 'Oct102018', 0.75, 2), ('Packers', 'Oct112018', -0.5, 1)]
+        self.assertEqual(self.returnDailySentiment(connection), expected)
+
+        #the buckets are only rebuilt when they are created, not every time the tables are checked
+        connection.execute("DELETE FROM HourlySentiment WHERE grp = 'Packers'")
+        SentimentAggregates(connection).createAggregateTables()
+        self.assertEqual(self.returnDailySentiment(connection), expected[:1])
+        connection.close()
+
+    def test_empty_database(self):
+        connection = db.connect(str(self.db_path))
+        TweetStore(connection, self.groups).createTweetTables()
+        SentimentAggregates(connection).createAggregateTables()
+        self.assertEqual(self.returnDailySentiment(connection), [])
+        connection.close()
+
+class BucketUpdateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = db.connect(':memory:')
+        self.tweet_store = TweetStore(self.connection, ['Bears'])
+        self.tweet_store.createTweetTables()
+        self.sentiment_aggregates = SentimentAggregates(self.connection)
+        self.sentiment_aggregates.createAggregateTables()
+        self.connection.execute("CREATE TABLE Tmp_Scored (%s)" % TweetStore.tweet_fields)
+
+    def tearDown(self):
+        self.connection.close()
+
+    def returnTweet(self, tweet_id, hour, sentiment):
+        return (20181010, tweet_id, 'fan', 'Wed Oct 10 %02i:19:24 -0500 2018' % hour, 'Oct102018', 'text', 0, 0, sentiment)
+
+    def returnBuckets(self):
+        return self.connection.execute("""SELECT grp, hour_key, ROUND(sentiment_sum, 9), ROUND(sentiment_sq_sum, 9),
+            tweet_count FROM HourlySentiment ORDER BY grp, hour_key""").fetchall()
+
+    def test_merge_skips_stored_tweets(self):
+        self.tweet_store.writeTweets('Bears', [self.returnTweet(1, 9, 0.5)])
+        self.sentiment_aggregates.replaceDay('Bears', 20181010)
+        self.connection.executemany("INSERT INTO Tmp_Scored VALUES ('Bears',?,?,?,?,?,?,?,?,?)",
+                                    [self.returnTweet(1, 9, 0.5), self.returnTweet(2, 9, -0.25), self.returnTweet(3, 20, 1.0)])
+        self.sentiment_aggregates.mergeNewTweets('Tmp_Scored')
+        self.assertEqual(self.returnBuckets(), [('Bears', 2018101009, 0.25, 0.3125, 2), ('Bears', 2018101020, 1.0, 1.0, 1)])
+
+    def test_replace_day(self):
+        self.tweet_store.writeTweets('Bears', [self.returnTweet(1, 9, 0.5), self.returnTweet(2, 20, 0.5)])
+        self.sentiment_aggregates.replaceDay('Bears', 20181010)
+        self.connection.execute("INSERT INTO HourlySentiment VALUES ('Bears', 2018101109, 'Oct112018', 1, 1, 1)")
+        self.connection.execute("UPDATE Tweets SET sentiment = -0.5 WHERE id = 2")
+        self.sentiment_aggregates.replaceDay('Bears', 20181010)
+        #the buckets of the other days are left alone
+        self.assertEqual(self.returnBuckets(), [('Bears', 2018101009, 0.5, 0.25, 1), ('Bears', 2018101020, -0.5, 0.25, 1),
+                                                ('Bears', 2018101109, 1.0, 1.0, 1)])
+
+    def test_replace_day_for_groups(self):
+        self.connection.execute("INSERT INTO HourlySentiment VALUES ('Packers', 2018101009, 'Oct102018', 1, 1, 1)")
+        self.connection.execute("INSERT INTO HourlySentiment VALUES ('Lions', 2018101009, 'Oct102018', 1, 1, 1)")
+        self.tweet_store.writeTweets('Bears', [self.returnTweet(1, 9, 0.5)])
+        self.sentiment_aggregates.replaceDayForGroups(['Bears', 'Packers'], 20181010)
+        #the Packers have no tweets on the day so their bucket goes, and the group that was not re-scored is left alone
+        self.assertEqual(self.returnBuckets(), [('Bears', 2018101009, 0.5, 0.25, 1), ('Lions', 2018101009, 1.0, 1.0, 1)])
+
+class RollingSentimentTest(unittest.TestCase):
+    groups = ['Bears', 'Packers', 'Lions']
+
+    def setUp(self):
+        self.connection = db.connect(':memory:')
+        SentimentAggregates(self.connection).createAggregateTables()
+        #random buckets over 75 days for the first two groups, none for the last one
+        rand = np.random.default_rng(2018)
+        self.first_date = date(2018, 8, 1)
+        self.buckets = {}
+        for group in self.groups[:2]:
+            for day_num in range(75):
+                day = self.first_date + timedelta(days = day_num)
+                for hour in rand.choice(24, rand.integers(0, 4), replace = False).tolist():
+                    sentiments = rand.uniform(-1, 1, rand.integers(1, 5))
+                    self.buckets[(group, day, hour)] = (sentiments.sum(), (sentiments ** 2).sum(), len(sentiments))
+        self.connection.executemany("INSERT INTO HourlySentiment VALUES (?,?,?,?,?,?)",
+                                    [(group, int(day.strftime('%Y%m%d')) * 100 + hour, day.strftime('%b%d%Y')) + bucket
+                                     for (group, day, hour), bucket in self.buckets.items()])
+
+    def tearDown(self):
+        self.connection.close()
+
+    def returnWindow(self, group, first_hour, last_hour):
+        """
+        Add up the buckets of a group between two hours, counted from midnight of the first day of the data
+        returns - a tuple of the mean, standard deviation and tweet count
+        """
+        totals = np.zeros(3)
+        for (bucket_group, day, hour), bucket in self.buckets.items():
+            bucket_hour = (day - self.first_date).days * 24 + hour
+            if bucket_group == group and first_hour <= bucket_hour <= last_hour:
+                totals += bucket
+        if totals[2] == 0:
+            return np.nan, np.nan, 0
+        mean = totals[0] / totals[2]
+        return mean, np.sqrt(max(totals[1] / totals[2] - mean ** 2, 0)), int(totals[2])
+
+    def checkRollingSentiment(self, results, start_date, periods_per_day, window_days):
+        periods = len(results['periods'])
+        first_hour = (start_date - self.first_date).days * 24
+        for n, group in enumerate(self.groups):
+            for days in window_days:
+                for period in range(periods):
+                    #the window ends at the end of the day, or the hour, that it is reported for
+                    last_hour = first_hour + (period + 1) * (24 // periods_per_day) - 1
+                    mean, std, count = self.returnWindow(group, last_hour - days * 24 + 1, last_hour)
+                    self.assertEqual(results[days]['count'][n, period], count)
+                    if count == 0:
+                        self.assertTrue(np.isnan(results[days]['mean'][n, period]))
+                        self.assertTrue(np.isnan(results[days]['std'][n, period]))
+                    else:
+                        self.assertAlmostEqual(results[days]['mean'][n, period], mean, places = 9)
+                        #the variance is compared as the square root magnifies the rounding of a variance near 0
+                        self.assertAlmostEqual(results[days]['std'][n, period] ** 2, std ** 2, places = 9)
+
+    def test_daily_windows(self):
+        #the windows at the start of the range reach back into the days before it
+        start_date, end_date = date(2018, 9, 5), date(2018, 10, 20)
+        results = SentimentAggregates(self.connection).getRollingSentiment(self.groups, start_date, end_date)
+        self.assertEqual(results['periods'][0], 20180905)
+        self.assertEqual(len(results['periods']), 46)
+        self.checkRollingSentiment(results, start_date, 1, (7, 30))
+
+    def test_hourly_windows(self):
+        start_date, end_date = date(2018, 8, 20), date(2018, 8, 23)
+        results = SentimentAggregates(self.connection).getRollingSentiment(self.groups, start_date, end_date, (1, 7), 'hour')
+        self.assertEqual(results['periods'][:2], [2018082000, 2018082001])
+        self.assertEqual(len(results['periods']), 96)
+        self.checkRollingSentiment(results, start_date, 24, (1, 7))
+
+    def test_database_without_buckets(self):
+        connection = db.connect(':memory:')
+        TweetStore(connection, self.groups).createTweetTables()
+        results = SentimentAggregates(connection).getRollingSentiment(self.groups, date(2018, 9, 1), date(2018, 9, 2))
+        self.assertEqual(results[7]['count'].tolist(), [[0, 0]] * 3)
+        self.assertTrue(np.isnan(results[30]['mean']).all())
+        connection.close()
+
+    def test_step(self):
+        with self.assertRaises(ValueError):
+            SentimentAggregates(self.connection).getRollingSentiment(self.groups, date(2018, 9, 1), date(2018, 9, 2), step = 'week')
+
+if __name__ == '__main__':
+    unittest.main()
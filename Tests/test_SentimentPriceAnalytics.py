@@ -0,0 +1,98 @@
+##!/usr/bin/env python
+"""
+Tests for the lagged correlations and rolling betas of SentimentPriceAnalytics against a plain pandas calculation of
+each (group, symbol, lag)
+"""
+
+#imports
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from Benchmarks.SentimentPriceBenchmark import createSentimentDatabase, createStockDatabase
+from PythonDataModules.SentimentPriceAnalytics import SentimentPriceAnalytics
+
+__author__ = "Dylan Smith"
+__copyright__ = "Copyright (C) 2018 Dylan Smith"
+__credits__ = ["Dylan Smith"]
+
+__license__ = "Personal Use"
+__version__ = "1.0"
+__maintainer__ = "Dylan Smith"
+__email__ = "-"
+__status__ = "Development"
+
+class SentimentPriceAnalyticsTest(unittest.TestCase):
+    groups = ['Bears', 'Packers', 'Lions']
+    symbols = ['AAA', 'BBB', 'CCC', 'DDD']
+    start_date, end_date = date(2018, 7, 1), date(2018, 10, 14)
+    lags = [-2, -1, 0, 1, 3]
+
+    def setUp(self):
+        self.root_dir = Path(tempfile.mkdtemp(prefix = 'twtr_test_'))
+        rand = np.random.default_rng(7)
+        days = [self.start_date + timedelta(days = n) for n in range((self.end_date - self.start_date).days + 1)]
+        self.sentiment_connection = createSentimentDatabase(self.root_dir.joinpath('CleansedData.db'), self.groups, days, rand)
+        self.stock_connection = createStockDatabase(self.root_dir.joinpath('Stocks.db'), self.symbols, days, rand)
+        #gaps in the data: a group without tweets for a month, a symbol missing some days and a symbol that only
+        #starts trading late in the range
+        self.sentiment_connection.execute("DELETE FROM HourlySentiment WHERE grp = 'Lions' AND hour_key BETWEEN 2018080100 AND 2018083123")
+        self.sentiment_connection.commit()
+        self.stock_connection.execute("DELETE FROM BBB WHERE CAST(substr(day, 9, 2) AS INT) % 5 = 0")
+        self.stock_connection.execute("DELETE FROM DDD WHERE day < '2018-09-20'")
+        self.stock_connection.commit()
+        self.analytics = SentimentPriceAnalytics(self.sentiment_connection, self.stock_connection)
+        self.aligned = self.analytics.getAlignedSeries(self.groups, self.symbols, self.start_date, self.end_date)
+
+    def tearDown(self):
+        self.sentiment_connection.close()
+        self.stock_connection.close()
+        shutil.rmtree(self.root_dir, ignore_errors = True)
+
+    def returnSeries(self, n, m, lag):
+        """
+        returns - the sentiment of group n shifted by the lag and the returns of symbol m, as pandas series
+        """
+        return pd.Series(self.aligned['sentiment'][n]).shift(lag), pd.Series(self.aligned['return'][m])
+
+    def test_gaps_are_missing_values(self):
+        self.assertTrue(np.isnan(self.aligned['sentiment'][2]).any())
+        self.assertTrue(np.isnan(self.aligned['return'][1]).sum() > 10)
+        self.assertTrue(np.isnan(self.aligned['return'][3][:40]).all())
+
+    def test_lagged_correlations(self):
+        results = self.analytics.getLaggedCorrelations(self.groups, self.symbols, self.start_date, self.end_date, self.lags)
+        self.assertEqual(results['correlation'].shape, (len(self.groups), len(self.symbols), len(self.lags)))
+        for n in range(len(self.groups)):
+            for m in range(len(self.symbols)):
+                for k, lag in enumerate(self.lags):
+                    sentiment, returns = self.returnSeries(n, m, lag)
+                    self.assertEqual(results['observations'][n, m, k], (sentiment.notna() & returns.notna()).sum())
+                    self.assertAlmostEqual(results['correlation'][n, m, k], sentiment.corr(returns), places = 10)
+
+    def test_rolling_betas(self):
+        window, min_periods = 15, 8
+        results = self.analytics.getRollingBetas(self.groups, self.symbols, self.start_date, self.end_date, window,
+                                                 self.lags, min_periods = min_periods)
+        self.assertEqual(results['days'], self.aligned['days'])
+        missing_windows = 0
+        for n in range(len(self.groups)):
+            for m in range(len(self.symbols)):
+                for k, lag in enumerate(self.lags):
+                    sentiment, returns = self.returnSeries(n, m, lag)
+                    for end in range(len(results['days'])):
+                        beta = results['beta'][n, m, k, end]
+                        shared = pd.DataFrame({'x': sentiment, 'y': returns}).iloc[max(end - window + 1, 0):end + 1].dropna()
+                        if end < window - 1 or len(shared) < min_periods:
+                            self.assertTrue(np.isnan(beta))
+                            missing_windows += 1
+                        else:
+                            self.assertAlmostEqual(beta, shared['x'].cov(shared['y']) / shared['x'].var(), places = 9)
+        #the gaps have to leave some windows without enough days for the masking to be tested
+        self.assertGreater(missing_windows, len(self.groups) * len(self.symbols) * len(self.lags) * (window - 1))
+
+if __name__ == '__main__':
+    unittest.main()
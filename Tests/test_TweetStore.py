@@ -0,0 +1,60 @@
+##!/usr/bin/env python
+"""
+Tests for the load log of the TweetStore and the days that are waiting to be scored
+"""
+
+#imports
+import sqlite3 as db
+import unittest
+from PythonDataModules.TweetStore import TweetStore
+
+__author__ = "Dylan Smith"
+__copyright__ = "Copyright (C) 2018 Dylan Smith"
+__credits__ = ["Dylan Smith"]
+
+__license__ = "Personal Use"
+__version__ = "1.0"
+__maintainer__ = "Dylan Smith"
+__email__ = "-"
+__status__ = "Development"
+
+class UnscoredDaysTest(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = db.connect(':memory:')
+        self.tweet_store = TweetStore(self.connection, ['Bears'])
+        self.tweet_store.createTweetTables()
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_unscored_days(self):
+        self.assertIsNone(self.tweet_store.returnUnscoredDays())
+        self.tweet_store.recordLoadCompletion('cleanse')
+        self.tweet_store.recordLoadCompletion('cleanse', ['Oct112018'])
+        self.assertIsNone(self.tweet_store.returnUnscoredDays())
+        self.tweet_store.recordLoadCompletion('score')
+        self.assertEqual(self.tweet_store.returnUnscoredDays(), [])
+
+        self.tweet_store.recordLoadCompletion('cleanse', ['Oct112018', 'Sep302018'])
+        self.tweet_store.recordLoadCompletion('benchmark')
+        self.tweet_store.recordLoadCompletion('cleanse', ['Oct122018'])
+        self.assertEqual(self.tweet_store.returnUnscoredDays(), ['Sep302018', 'Oct112018', 'Oct122018'])
+        self.tweet_store.recordLoadCompletion('score', ['Oct112018'])
+        self.tweet_store.recordLoadCompletion('fused', ['Oct122018'])
+        self.assertEqual(self.tweet_store.returnUnscoredDays(), ['Sep302018'])
+        self.tweet_store.recordLoadCompletion('fused')
+        self.assertEqual(self.tweet_store.returnUnscoredDays(), [])
+
+    def test_load_log_from_before_the_days(self):
+        connection = db.connect(':memory:')
+        connection.execute("CREATE TABLE LoadLog (load_id INTEGER PRIMARY KEY AUTOINCREMENT, stage TEXT, completed TEXT)")
+        connection.execute("INSERT INTO LoadLog (stage, completed) VALUES ('score', '2018-10-10')")
+        tweet_store = TweetStore(connection, ['Bears'])
+        tweet_store.createTweetTables()
+        tweet_store.recordLoadCompletion('cleanse', ['Oct112018'])
+        self.assertEqual(tweet_store.returnUnscoredDays(), ['Oct112018'])
+        connection.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,227 @@
+##!/usr/bin/env python
+"""
+Tests for the stages of the TwitterAnalysisTool and its command line
+"""
+
+#imports
+import contextlib
+import csv
+import io
+import shutil
+import sqlite3 as db
+import tempfile
+import unittest
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from Benchmarks.SyntheticTweetGenerator import SyntheticTweetGenerator
+from LegacyProject import createLegacyDatabase, createProject, writeRawTweets
+from TwitterAnalysisTool import TwitterAnalysisTool, main
+
+__author__ = "Dylan Smith"
+__copyright__ = "Copyright (C) 2018 Dylan Smith"
+__credits__ = ["Dylan Smith"]
+
+__license__ = "Personal Use"
+__version__ = "1.0"
+__maintainer__ = "Dylan Smith"
+__email__ = "-"
+__status__ = "Development"
+
+class ReadOnlyStageTest(unittest.TestCase):
+    groups = ['Bears', 'Packers']
+
+    def setUp(self):
+        self.root_dir = Path(tempfile.mkdtemp(prefix = 'twtr_test_'))
+        self.proj_data_dir, self.proj_analysis_dir = createProject(self.root_dir, self.groups)
+        self.db_path = self.proj_analysis_dir.joinpath('CleansedData.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.root_dir, ignore_errors = True)
+
+    def returnSchema(self):
+        connection = db.connect(str(self.db_path))
+        schema = connection.execute("SELECT type, name, sql FROM sqlite_master ORDER BY name").fetchall()
+        journal_mode = connection.execute("PRAGMA journal_mode").fetchone()[0]
+        connection.close()
+        return schema, journal_mode
+
+    def test_legacy_database_is_not_changed(self):
+        createLegacyDatabase(self.db_path, [('Bears', 1, 'Oct102018', 'one', None, 0.5),
+                                            ('Bears', 2, 'Oct112018', 'two', None, 0.25),
+                                            ('Packers', 3, 'Oct102018', 'three', 'one', -0.5)])
+        schema = self.returnSchema()
+        twitter_analysis = TwitterAnalysisTool('Area', 'Project', self.root_dir)
+        status = {group_status['group']: group_status for group_status in twitter_analysis.returnProjectStatus()}
+        self.assertEqual((status['Bears']['cleansed_tweets'], status['Bears']['cleansed_days']), (2, 2))
+        self.assertEqual((status['Packers']['cleansed_tweets'], status['Packers']['cleansed_days']), (1, 1))
+
+        twitter_analysis.exportSentimentData()
+        with open(self.proj_analysis_dir.joinpath('RecordCounts.csv'), 'r', newline = '') as file:
+            record_counts = {row['Date']: row for row in csv.DictReader(file)}
+        self.assertEqual([(day, row['Bears'], row['Packers']) for day, row in record_counts.items()],
+                         [('Oct102018', '1', '1'), ('Oct112018', '1', '0')])
+        twitter_analysis.connection.close()
+        self.assertEqual(self.returnSchema(), schema)
+
+    def test_empty_database(self):
+        twitter_analysis = TwitterAnalysisTool('Area', 'Project', self.root_dir)
+        self.assertEqual([group_status['cleansed_tweets'] for group_status in twitter_analysis.returnProjectStatus()], [0, 0])
+        twitter_analysis.connection.close()
+
+class ScoreDaysTest(unittest.TestCase):
+    groups = ['Bears', 'Packers']
+
+    def setUp(self):
+        self.root_dir = Path(tempfile.mkdtemp(prefix = 'twtr_test_'))
+        self.proj_data_dir, self.proj_analysis_dir = createProject(self.root_dir, self.groups)
+
+    def tearDown(self):
+        shutil.rmtree(self.root_dir, ignore_errors = True)
+
+    def returnLastLoad(self, twitter_analysis):
+        return twitter_analysis.connection.execute("SELECT stage, days FROM LoadLog ORDER BY load_id DESC LIMIT 1").fetchone()
+
+    def test_score_after_delta_cleanse_in_another_run(self):
+        for group, tweet_id in [('Bears', 1), ('Packers', 2)]:
+            writeRawTweets(self.proj_data_dir.joinpath(group, '%s20181010.csv.gz' % group),
+                           [(tweet_id, 'fan', 'Wed Oct 10 18:00:00 +0000 2018', 'a good day', '', '')])
+        twitter_analysis = TwitterAnalysisTool('Area', 'Project', self.root_dir)
+        twitter_analysis.processAndStoreData('FULL')
+        twitter_analysis.calculateSentiment()
+        self.assertEqual(self.returnLastLoad(twitter_analysis), ('score', None))
+        twitter_analysis.connection.close()
+
+        today = datetime.today()
+        for group, tweet_id in [('Bears', 3), ('Packers', 4)]:
+            writeRawTweets(self.proj_data_dir.joinpath(group, '%s%s.csv.gz' % (group, today.strftime('%Y%m%d'))),
+                           [(tweet_id, 'fan', today.strftime('%a %b %d 18:00:00 +0000 %Y'), 'a bad day', '', '')])
+        twitter_analysis = TwitterAnalysisTool('Area', 'Project', self.root_dir)
+        twitter_analysis.processAndStoreData('DELTA')
+        twitter_analysis.connection.close()
+
+        #the score runs as its own invocation and only scores the day of the delta cleanse
+        twitter_analysis = TwitterAnalysisTool('Area', 'Project', self.root_dir)
+        twitter_analysis.calculateSentiment()
+        self.assertEqual(self.returnLastLoad(twitter_analysis), ('score', '["%s"]' % today.strftime('%b%d%Y')))
+        self.assertEqual(twitter_analysis.tweet_store.returnUnscoredDays(), [])
+        tweet_counts = twitter_analysis.connection.execute("SELECT grp, SUM(tweet_count) FROM DailySentiment GROUP BY grp").fetchall()
+        self.assertEqual(tweet_counts, [('Bears', 2), ('Packers', 2)])
+        twitter_analysis.connection.close()
+
+    def test_days_are_scored_for_every_group(self):
+        #each group has tweets on a day that the other group does not
+        for group, file_date, tweets in [('Bears', '20181010', [(1, 'a good day')]),
+                                         ('Packers', '20181010', [(2, 'what a great game')]),
+                                         ('Packers', '20181011', [(3, 'a bad day')])]:
+            created_at = datetime.strptime(file_date, '%Y%m%d').strftime('%a %b %d 18:00:00 +0000 %Y')
+            writeRawTweets(self.proj_data_dir.joinpath(group, '%s%s.csv.gz' % (group, file_date)),
+                           [(tweet_id, 'fan', created_at, full_text, '', '') for tweet_id, full_text in tweets])
+        twitter_analysis = TwitterAnalysisTool('Area', 'Project', self.root_dir)
+        twitter_analysis.processAndStoreData('FULL')
+        twitter_analysis.calculateSentiment()
+        analyzer = SentimentIntensityAnalyzer()
+        scored = twitter_analysis.connection.execute("SELECT grp, day, full_text, sentiment FROM Tweets ORDER BY id").fetchall()
+        self.assertEqual([(group, day, sentiment) for group, day, _, sentiment in scored],
+                         [(group, day, analyzer.polarity_scores(full_text)['compound']) for group, day, full_text, _ in scored])
+        daily_sentiment = twitter_analysis.connection.execute("""SELECT grp, day, sentiment_sum, tweet_count FROM DailySentiment
+            ORDER BY grp, day""").fetchall()
+        self.assertEqual(daily_sentiment, [(group, day, sentiment, 1) for group, day, _, sentiment in sorted(scored)])
+        twitter_analysis.connection.close()
+
+    def returnRecordCounts(self):
+        with open(self.proj_analysis_dir.joinpath('RecordCounts.csv'), 'r', newline = '') as file:
+            return [(row['Date'], row['Bears'], row['Packers']) for row in csv.DictReader(file)]
+
+    def test_export_leaves_out_unscored_tweets(self):
+        today = datetime.today()
+        def writeTodaysTweets(tweet_ids):
+            for group, tweet_id in zip(self.groups, tweet_ids):
+                writeRawTweets(self.proj_data_dir.joinpath(group, '%s%s.csv.gz' % (group, today.strftime('%Y%m%d'))),
+                               [(tweet_id, 'fan', today.strftime('%a %b %d 18:00:00 +0000 %Y'), 'what a great game', '', '')])
+
+        writeTodaysTweets([1, 2])
+        twitter_analysis = TwitterAnalysisTool('Area', 'Project', self.root_dir)
+        twitter_analysis.processAndStoreData('DELTA')
+        twitter_analysis.exportSentimentData()
+        self.assertEqual(self.returnRecordCounts(), [])
+        twitter_analysis.calculateSentiment()
+        twitter_analysis.exportSentimentData()
+        with open(self.proj_analysis_dir.joinpath('CalculatedSentimentData.csv'), 'r', newline = '') as file:
+            scored = list(csv.DictReader(file))
+
+        #the same tweet again, cleansed and not scored yet
+        writeTodaysTweets([3, 4])
+        twitter_analysis.processAndStoreData('DELTA')
+        twitter_analysis.exportSentimentData()
+        with open(self.proj_analysis_dir.joinpath('CalculatedSentimentData.csv'), 'r', newline = '') as file:
+            self.assertEqual(list(csv.DictReader(file)), scored)
+        self.assertEqual(self.returnRecordCounts(), [(today.strftime('%b%d%Y'), '1', '1')])
+        self.assertGreater(float(scored[0]['Bears']), 0)
+        twitter_analysis.connection.close()
+
+class FusedCleanseTest(unittest.TestCase):
+    groups = ['Bears', 'Packers', 'Vikings']
+
+    def setUp(self):
+        self.root_dir = Path(tempfile.mkdtemp(prefix = 'twtr_test_'))
+
+    def tearDown(self):
+        shutil.rmtree(self.root_dir, ignore_errors = True)
+
+    def runProject(self, fused):
+        """
+        Load three days of history with a FULL cleanse and then today's tweets with a DELTA cleanse, either fused or
+        followed by the score stage
+        returns - the tweets, the daily sentiment and the rows of the two csv files of the project
+        """
+        project_dir = self.root_dir.joinpath('fused' if fused else 'plain')
+        proj_data_dir, proj_analysis_dir = createProject(project_dir, self.groups)
+        today = datetime.combine(date.today(), time())
+        twitter_analysis = TwitterAnalysisTool('Area', 'Project', project_dir)
+        for load_type, seed, total_tweets, days, end_date in [('FULL', 1, 900, 3, today - timedelta(days = 1)),
+                                                              ('DELTA', 2, 300, 1, today)]:
+            SyntheticTweetGenerator(seed = seed).writeRawTweets(proj_data_dir, self.groups, total_tweets, days, end_date)
+            twitter_analysis.processAndStoreData(load_type, fused)
+            if not fused:
+                twitter_analysis.calculateSentiment()
+
+        tweets = twitter_analysis.connection.execute("""SELECT grp, id, day, full_text, replied_to_id, retweets,
+            ROUND(sentiment, 9) FROM Tweets ORDER BY grp, id""").fetchall()
+        daily_sentiment = twitter_analysis.connection.execute("""SELECT grp, day, ROUND(sentiment_sum, 9),
+            ROUND(sentiment_sq_sum, 9), tweet_count FROM DailySentiment ORDER BY grp, day""").fetchall()
+        twitter_analysis.connection.close()
+        csv_rows = {}
+        for file_name in ['CalculatedSentimentData.csv', 'RecordCounts.csv']:
+            with open(proj_analysis_dir.joinpath(file_name), 'r', newline = '') as file:
+                csv_rows[file_name] = sorted(csv.DictReader(file), key = lambda row: row['Date'])
+        return tweets, daily_sentiment, csv_rows
+
+    def test_fused_matches_cleanse_and_score(self):
+        tweets, daily_sentiment, csv_rows = self.runProject(fused = False)
+        fused_tweets, fused_daily_sentiment, fused_csv_rows = self.runProject(fused = True)
+        self.assertGreater(len(tweets), 500)
+        self.assertEqual(fused_tweets, tweets)
+        self.assertEqual(fused_daily_sentiment, daily_sentiment)
+        self.assertEqual(fused_csv_rows['RecordCounts.csv'], csv_rows['RecordCounts.csv'])
+        #the means are summed in a different order, so they can differ in the last bits
+        sentiment_rows, fused_sentiment_rows = csv_rows['CalculatedSentimentData.csv'], fused_csv_rows['CalculatedSentimentData.csv']
+        self.assertEqual([row['Date'] for row in fused_sentiment_rows], [row['Date'] for row in sentiment_rows])
+        for row, fused_row in zip(sentiment_rows, fused_sentiment_rows):
+            for group in self.groups:
+                self.assertAlmostEqual(float(fused_row[group]), float(row[group]), places = 9)
+
+class ArgumentTest(unittest.TestCase):
+
+    def test_reply_depth_below_one(self):
+        for reply_depth in ['0', '-2', 'two']:
+            with self.assertRaises(SystemExit), contextlib.redirect_stderr(io.StringIO()):
+                main(['Area', 'Project', 'cleanse', '--delta', '--reply-depth', reply_depth])
+
+    def test_cleanse_needs_load_type(self):
+        for arguments in [[], ['--full', '--delta']]:
+            with self.assertRaises(SystemExit), contextlib.redirect_stderr(io.StringIO()):
+                main(['Area', 'Project', 'cleanse'] + arguments)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+##!/usr/bin/env python
+"""
+Tests for the reply resolution of the TwitterCleanser through the ParentText index of the TweetStore, including
+databases that are migrated from the per group tables.
+"""
+
+#imports
+import shutil
+import sqlite3 as db
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from LegacyProject import createLegacyDatabase, createProject, writeRawTweets
+from PythonDataModules.TweetStore import TweetStore
+from PythonDataModules.TwitterCleanser import TwitterCleanser
+from PythonDataModules.TwitterSentimentAnalyzer import TwitterSentimentAnalyzer
+
+__author__ = "Dylan Smith"
+__copyright__ = "Copyright (C) 2018 Dylan Smith"
+__credits__ = ["Dylan Smith"]
+
+__license__ = "Personal Use"
+__version__ = "1.0"
+__maintainer__ = "Dylan Smith"
+__email__ = "-"
+__status__ = "Development"
+
+created_at = 'Wed Oct 10 20:19:24 +0000 2018'
+
+class ReplyResolutionTest(unittest.TestCase):
+    groups = ['Bears', 'Packers']
+
+    def setUp(self):
+        self.root_dir = Path(tempfile.mkdtemp(prefix = 'twtr_test_'))
+        self.proj_data_dir, self.proj_analysis_dir = createProject(self.root_dir, self.groups)
+        self.db_path = self.proj_analysis_dir.joinpath('CleansedData.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.root_dir, ignore_errors = True)
+
+    def returnText(self, connection, tweet_id):
+        return connection.execute("SELECT full_text FROM Tweets WHERE id = ?", (tweet_id,)).fetchone()[0]
+
+    def test_migrated_parent_resolves_for_delta_reply(self):
+        createLegacyDatabase(self.db_path, [('Bears', 1, 'Oct102018', 'parent text here', None, 0.5),
+                                            ('Packers', 2, 'Oct102018', 'first reply', 'parent text here', 0.1)])
+        connection = db.connect(str(self.db_path))
+        TweetStore(connection, self.groups).createTweetTables()
+        self.assertEqual(connection.execute("SELECT * FROM ParentText ORDER BY id").fetchall(),
+                         [(1, 0, 'parent text here'), (2, -1, 'first reply')])
+
+        today = datetime.today().strftime('%Y%m%d')
+        writeRawTweets(self.proj_data_dir.joinpath('Packers', 'Packers%s.csv.gz' % today),
+                       [(3, 'fan', created_at, 'reply text here', 1, ''),
+                        (4, 'fan', created_at, 'second reply', 2, '')])
+        writeRawTweets(self.proj_data_dir.joinpath('Bears', 'Bears%s.csv.gz' % today),
+                       [(5, 'fan', created_at, 'new original', '', '')])
+        twitter_cleanser = TwitterCleanser(self.proj_data_dir, connection, 'DELTA')
+        twitter_cleanser.uploadTweetsIntoCleanser()
+        twitter_cleanser.cleanseRepliedTweets()
+        self.assertEqual(self.returnText(connection, 3), 'parent text here || -> reply text here')
+        self.assertEqual(self.returnText(connection, 4), 'first reply || -> second reply')
+        connection.close()
+
+    def test_thread_depth(self):
+        writeRawTweets(self.proj_data_dir.joinpath('Bears', 'Bears20181010.csv.gz'),
+                       [(10, 'fan', created_at, 'root', '', ''),
+                        (12, 'fan', created_at, 'reply two', 11, ''),
+                        (13, 'fan', created_at, 'lost reply', 99, '')])
+        writeRawTweets(self.proj_data_dir.joinpath('Packers', 'Packers20181010.csv.gz'),
+                       [(11, 'fan', created_at, 'reply one', 10, '')])
+        expected = {1: 'reply one || -> reply two', 2: 'root || -> reply one || -> reply two',
+                    5: 'root || -> reply one || -> reply two'}
+        for (reply_depth, text), fused in [(item, fused) for item in expected.items() for fused in [False, True]]:
+            connection = db.connect(':memory:')
+            #a fused load resolves the replies in memory instead of through the staging table
+            sentiment_scorer = TwitterSentimentAnalyzer(self.proj_data_dir, self.proj_analysis_dir, connection, None) if fused else None
+            twitter_cleanser = TwitterCleanser(self.proj_data_dir, connection, 'FULL', sentiment_scorer, reply_depth)
+            twitter_cleanser.uploadTweetsIntoCleanser()
+            twitter_cleanser.cleanseRepliedTweets()
+            self.assertEqual(self.returnText(connection, 12), text)
+            self.assertEqual(self.returnText(connection, 11), 'root || -> reply one')
+            self.assertEqual(self.returnText(connection, 13), '  || -> lost reply')
+            connection.close()
+
+    def test_reply_depth_below_one(self):
+        connection = db.connect(':memory:')
+        for reply_depth in [0, -1]:
+            with self.assertRaises(ValueError):
+                TwitterCleanser(self.proj_data_dir, connection, 'FULL', reply_depth = reply_depth)
+        connection.close()
+
+if __name__ == '__main__':
+    unittest.main()
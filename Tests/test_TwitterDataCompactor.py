@@ -0,0 +1,92 @@
+##!/usr/bin/env python
+"""
+Tests for the monthly archives and the retention policy of the TwitterDataCompactor
+"""
+
+#imports
+import shutil
+import sqlite3 as db
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+from LegacyProject import createProject, writeRawTweets
+from PythonDataModules.TwitterCleanser import TwitterCleanser
+from PythonDataModules.TwitterDataCompactor import TwitterDataCompactor
+
+__author__ = "Dylan Smith"
+__copyright__ = "Copyright (C) 2018 Dylan Smith"
+__credits__ = ["Dylan Smith"]
+
+__license__ = "Personal Use"
+__version__ = "1.0"
+__maintainer__ = "Dylan Smith"
+__email__ = "-"
+__status__ = "Development"
+
+class CompactionTest(unittest.TestCase):
+    groups = ['Bears']
+
+    def setUp(self):
+        self.root_dir = Path(tempfile.mkdtemp(prefix = 'twtr_test_'))
+        self.proj_data_dir, self.proj_analysis_dir = createProject(self.root_dir, self.groups)
+        self.group_dir = self.proj_data_dir.joinpath('Bears')
+        for file_date, tweet_ids in [('20181010', [1, 2]), ('20181011', [2, 3]), ('20181105', [4]), ('20181201', [5])]:
+            created_at = datetime.strptime(file_date, '%Y%m%d').strftime('%a %b %d 18:00:00 +0000 %Y')
+            writeRawTweets(self.group_dir.joinpath('Bears%s.csv.gz' % file_date),
+                           [(tweet_id, 'fan', created_at, 'tweet %i' % tweet_id, '', '') for tweet_id in tweet_ids])
+
+    def tearDown(self):
+        shutil.rmtree(self.root_dir, ignore_errors = True)
+
+    def returnCompactor(self, raw_retention_days = 7, archive_retention_months = None, current_date = datetime(2018, 12, 5)):
+        twitter_compactor = TwitterDataCompactor(self.proj_data_dir, raw_retention_days, archive_retention_months)
+        twitter_compactor.current_date = current_date
+        return twitter_compactor
+
+    def test_compact_finished_months(self):
+        twitter_compactor = self.returnCompactor(raw_retention_days = None)
+        twitter_compactor.compactAllGroups()
+        manifest = twitter_compactor.returnManifest('Bears')
+        self.assertEqual(sorted(manifest), ['Bears201810.parquet', 'Bears201811.parquet'])
+        self.assertEqual((manifest['Bears201810.parquet']['files'], manifest['Bears201810.parquet']['source_rows'],
+                          manifest['Bears201810.parquet']['rows']), (['Bears20181010.csv.gz', 'Bears20181011.csv.gz'], 4, 3))
+        archive_DF = TwitterDataCompactor.readRawTweetFile(self.group_dir.joinpath('Archive', 'Bears201810.parquet'))
+        self.assertEqual(archive_DF['id'].tolist(), ['1', '2', '3'])
+        self.assertEqual([path.name for path in twitter_compactor.returnRawDataFiles('Bears')],
+                         ['Bears201810.parquet', 'Bears201811.parquet', 'Bears20181201.csv.gz'])
+
+        #a late file for a month that is already archived is merged into its archive
+        writeRawTweets(self.group_dir.joinpath('Bears20181012.csv.gz'), [(6, 'fan', 'Fri Oct 12 18:00:00 +0000 2018', 'late', '', '')])
+        twitter_compactor.compactAllGroups()
+        manifest = twitter_compactor.returnManifest('Bears')
+        self.assertEqual((manifest['Bears201810.parquet']['source_rows'], manifest['Bears201810.parquet']['rows']), (5, 4))
+
+    def test_full_load_reads_archives(self):
+        self.returnCompactor(raw_retention_days = 0).compactAllGroups()
+        self.assertEqual(sorted(f.name for f in self.group_dir.iterdir() if f.is_file()), ['Bears20181201.csv.gz'])
+        connection = db.connect(':memory:')
+        twitter_cleanser = TwitterCleanser(self.proj_data_dir, connection, 'FULL')
+        twitter_cleanser.uploadTweetsIntoCleanser()
+        twitter_cleanser.cleanseRepliedTweets()
+        self.assertEqual([row[0] for row in connection.execute("SELECT id FROM Tweets ORDER BY id")], [1, 2, 3, 4, 5])
+        connection.close()
+
+    def test_archive_retention(self):
+        self.returnCompactor(raw_retention_days = None).compactAllGroups()
+        twitter_compactor = self.returnCompactor(raw_retention_days = None, archive_retention_months = 1)
+        twitter_compactor.applyRetentionPolicy('Bears')
+        self.assertEqual(sorted(twitter_compactor.returnManifest('Bears')), ['Bears201811.parquet'])
+        self.assertFalse(self.group_dir.joinpath('Archive', 'Bears201810.parquet').exists())
+        self.assertFalse(self.group_dir.joinpath('Bears20181010.csv.gz').exists())
+        self.assertTrue(self.group_dir.joinpath('Bears20181105.csv.gz').exists())
+
+    def test_verify_archive(self):
+        archive_path = self.root_dir.joinpath('Bad.parquet')
+        pd.DataFrame({'id': ['1', '1']}).to_parquet(archive_path, index = False)
+        with self.assertRaises(ValueError):
+            TwitterDataCompactor(self.proj_data_dir).verifyArchive(archive_path, pd.DataFrame({'id': ['1', '2']}))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+##!/usr/bin/env python
+"""
+Tests for the answers of the TwitterSentimentQuery, on its own and over http, for databases in every layout
+"""
+
+#imports
+import json
+import shutil
+import sqlite3 as db
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from urllib.error import HTTPError
+from urllib.request import urlopen
+from LegacyProject import createLegacyDatabase
+from PythonDataModules.SentimentAggregates import SentimentAggregates
+from PythonDataModules.TweetStore import TweetStore
+from PythonDataModules.TwitterSentimentQuery import SentimentRequestHandler, ThreadingHTTPServer, TwitterSentimentQuery
+
+__author__ = "Dylan Smith"
+__copyright__ = "Copyright (C) 2018 Dylan Smith"
+__credits__ = ["Dylan Smith"]
+
+__license__ = "Personal Use"
+__version__ = "1.0"
+__maintainer__ = "Dylan Smith"
+__email__ = "-"
+__status__ = "Development"
+
+class SentimentQueryTest(unittest.TestCase):
+    groups = ['Bears', 'Packers']
+
+    def setUp(self):
+        self.root_dir = Path(tempfile.mkdtemp(prefix = 'twtr_test_'))
+        self.db_path = self.root_dir.joinpath('CleansedData.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.root_dir, ignore_errors = True)
+
+    def returnResults(self, sentiment_query, granularity = 'day'):
+        return [(row['group'], row['period'], round(row['sentiment'], 6), row['count'])
+                for row in sentiment_query.getSentiment(self.groups, 20181001, 20181031, granularity)]
+
+    def test_unscored_tweets_are_left_out(self):
+        connection = db.connect(str(self.db_path))
+        tweet_store = TweetStore(connection, self.groups)
+        tweet_store.createTweetTables()
+        sentiment_aggregates = SentimentAggregates(connection)
+        sentiment_aggregates.createAggregateTables()
+        tweet_store.writeTweets('Bears', [(20181010, 1, 'fan', 'Wed Oct 10 12:00:00 -0500 2018', 'Oct102018', 'one', 0, 0, 0.75),
+                                          (20181011, 2, 'fan', 'Thu Oct 11 12:00:00 -0500 2018', 'Oct112018', 'two', 0, 0, 0.25)])
+        for day_key in [20181010, 20181011]:
+            sentiment_aggregates.replaceDay('Bears', day_key)
+        tweet_store.recordLoadCompletion('score')
+        sentiment_query = TwitterSentimentQuery(self.db_path)
+        expected = [('Bears', 20181010, 0.75, 1), ('Bears', 20181011, 0.25, 1)]
+        self.assertEqual(self.returnResults(sentiment_query), expected)
+
+        #a cleanse writes the tweet with a sentiment of 0 and records a load before the score stage has run
+        tweet_store.writeTweets('Bears', [(20181010, 3, 'fan', 'Wed Oct 10 13:00:00 -0500 2018', 'Oct102018', 'one', 0, 0, 0)])
+        tweet_store.recordLoadCompletion('cleanse', ['Oct102018'])
+        self.assertEqual(self.returnResults(sentiment_query), expected)
+        self.assertEqual(self.returnResults(sentiment_query, 'week'), [('Bears', 'Week41|2018', 0.5, 2)])
+        connection.close()
+
+    def test_database_that_is_not_migrated(self):
+        createLegacyDatabase(self.db_path, [('Bears', 1, 'Oct102018', 'one', None, 0.5),
+                                            ('Bears', 2, 'Oct102018', 'two', None, 0.25),
+                                            ('Packers', 3, 'Oct112018', 'three', 'one', -0.5)])
+        sentiment_query = TwitterSentimentQuery(self.db_path)
+        self.assertEqual(self.returnResults(sentiment_query), [('Bears', 20181010, 0.375, 2), ('Packers', 20181011, -0.5, 1)])
+
+    def test_database_without_scored_tweets(self):
+        db.connect(str(self.db_path)).close()
+        self.assertEqual(self.returnResults(TwitterSentimentQuery(self.db_path)), [])
+        connection = db.connect(str(self.db_path))
+        TweetStore(connection, self.groups).createTweetTables()
+        connection.close()
+        self.assertEqual(self.returnResults(TwitterSentimentQuery(self.db_path)), [])
+
+    def test_http_errors_are_answered(self):
+        with open(self.db_path, 'w') as file:
+            file.write('this is not a database' * 100)
+        server = ThreadingHTTPServer(('127.0.0.1', 0), SentimentRequestHandler)
+        server.sentiment_query = TwitterSentimentQuery(self.db_path)
+        server_thread = threading.Thread(target = server.serve_forever)
+        server_thread.start()
+        try:
+            with self.assertRaises(HTTPError) as response:
+                urlopen('http://127.0.0.1:%i/sentiment?groups=Bears&start=20181001&end=20181031' % server.server_port)
+            self.assertEqual(response.exception.code, 503)
+            self.assertIn('error', json.loads(response.exception.read().decode('utf-8')))
+            response.exception.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+            server_thread.join()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -23,17 +23,37 @@ Version 2.0:
 Version 3.0:
     -Updated to fit within a structure that allowed multiple projects to be used
     -Inserted cleansed data into an SQLite database.  Also tried to trim the amouht of distinct files
+Version 3.1:
+    -Split the driver into subcommands (download, cleanse, score, export, status) so that each cron invocation
+    only runs, and only imports, the stage that it needs.  The data modules are imported inside the methods that
+    use them because pandas, pytz, twython and vaderSentiment dominate the start up time of the program.
+    -Added a fused cleanse (cleanse --fused) that scores each batch of tweets as it is cleansed and keeps running
+    daily sentiment totals in the DailySentiment table, so the tweets are not read back and re-written to be scored.
+    -Moved the cleansed tweets of every group into the single Tweets table (see TweetStore).  Existing databases are
+    migrated by the first cleanse or score and the old group tables are replaced by views with the same names.
+    The other stages do not change the database; export and status read the old group tables until then.
+    -Added the serve subcommand, a read only http service for the sentiment of a project (see TwitterSentimentQuery)
+    -Replaced the DailySentiment totals with mergeable hourly buckets (sum, sum of squares, count) that are updated
+    as tweets are scored, with DailySentiment kept as a view.  Rolling 7 and 30 day windows are calculated from the
+    buckets (see SentimentAggregates)
+    -Added SentimentPriceAnalytics to correlate the sentiment of the groups with the stock prices of symbols
+    -Added the compact subcommand, which merges the daily raw files of each finished month into a parquet archive
+    and applies a retention policy to the raw data.  FULL loads read the archives in place of the daily files
+    -Replies are resolved through a ParentText index of every original and reply, so a reply to a reply gets the
+    text of its parent, and cleanse --reply-depth N adds the text of N tweets up the thread
 """
 #Imports
 import sys
+import argparse
+import csv
+from os import listdir
+from os.path import isdir, join
 from pathlib import Path
-from PythonDataModules.TwitterScraper import TwitterScraper
-from PythonDataModules.TwitterCleanser import TwitterCleanser
-from PythonDataModules.TwitterSentimentAnalyzer import TwitterSentimentAnalyzer
 import logging
 logging.basicConfig(stream=sys.stdout, level = logging.INFO)
 import sqlite3 as db
 import json
+from PythonDataModules.TweetStore import TweetStore
 
 __author__ = "Dylan Smith"
 __copyright__ = "Copyright (C) 2018 Dylan Smith"
@@ -50,12 +70,22 @@ class TwitterAnalysisTool(object):
     curr_dir = Path(__file__).resolve().parent
 
     #initialization
-    def __init__(self, project_area, project_name):
+    def __init__(self, project_area, project_name, root_dir = None):
+        """
+        ::param project_area: The project area that is being processed. This corresponds to the folder that will be used
+        ::param project_name: The project name that will be used to drive the Analysis
+        ::param root_dir(Optional): The folder that holds the project folders.  Defaults to the folder of this file
+        """
+        root_dir = Path(root_dir) if root_dir is not None else self.curr_dir
         self.proj_nm = project_name
-        self.proj_data_dir = self.curr_dir.joinpath('DataSources','Twitter', project_name)
-        self.proj_analysis_dir = self.curr_dir.joinpath(project_area, project_name)
-        self.api_key = self.curr_dir.joinpath('APIKeys', project_name + 'TwitterAPIKeys.json')
+        self.proj_data_dir = root_dir.joinpath('DataSources','Twitter', project_name)
+        self.proj_analysis_dir = root_dir.joinpath(project_area, project_name)
+        self.api_key = root_dir.joinpath('APIKeys', project_name + 'TwitterAPIKeys.json')
         self.connection = db.connect(str(self.proj_analysis_dir.joinpath('CleansedData.db')))
+        self.days_to_update = None
+        self.all_groups = [f for f in listdir(self.proj_data_dir) if isdir(join(self.proj_data_dir, f))]
+        #the tables are created (and an old database migrated) by the stages that write to the database
+        self.tweet_store = TweetStore(self.connection, self.all_groups)
 
     def downloadRecentTwitterActivity(self):
         """
@@ -63,6 +93,7 @@ class TwitterAnalysisTool(object):
         the project.  Twitter API specifications are set in this function so that the parameters outside of the query
         terms are all the same
         """
+        from PythonDataModules.TwitterScraper import TwitterScraper
         twython_scraper = TwitterScraper(proj_data_dir = self.proj_data_dir,
                                         proj_analysis_dir = self.proj_analysis_dir,
                                         api_key_file = self.api_key)
@@ -87,32 +118,131 @@ class TwitterAnalysisTool(object):
                 json.dump(prj_qry_data, fp, indent=2)
             logging.info("Finished Downloading Tweets for %s" % grp_nm)
 
-    def processAndStoreData(self, load_type):
+    def processAndStoreData(self, load_type, fused = False, reply_depth = 1):
         """
         This function instantiates a twitter cleanser object as well as a twitter sentiment object.
         It takes a load type and cleanses/applies sentiment tools to that subset of data
 
         params load_type: Takes a string input and specifies which records should be classified.  It is either
                           a delta load or a full load.
+        params fused(Optional): Score the tweets while they are cleansed so that each tweet is written once and
+                          the aggregated sentiment files are updated without a separate sentiment pass
+        params reply_depth(Optional): The number of tweets up the thread of a reply whose text is added to the reply
         """
+        from PythonDataModules.TwitterCleanser import TwitterCleanser
+        twitter_sentiment = None
+        if fused:
+            from PythonDataModules.TwitterSentimentAnalyzer import TwitterSentimentAnalyzer
+            twitter_sentiment = TwitterSentimentAnalyzer(proj_data_dir = self.proj_data_dir
+                                                ,proj_analysis_dir = self.proj_analysis_dir
+                                                ,db_connection = self.connection
+                                                ,days_to_update = None)
         self.twitter_cleanser = TwitterCleanser(proj_data_dir = self.proj_data_dir
                                                 ,db_connection= self.connection
-                                                ,load_type = load_type)
+                                                ,load_type = load_type
+                                                ,sentiment_scorer = twitter_sentiment
+                                                ,reply_depth = reply_depth)
         self.twitter_cleanser.uploadTweetsIntoCleanser()
-        self.twitter_cleanser.updateOriginalTweets()
         self.twitter_cleanser.cleanseRepliedTweets()
+        self.days_to_update = self.twitter_cleanser.getDaysToUpdate()
+        if fused:
+            twitter_sentiment.updateAnalyticsFiles(self.days_to_update)
+        #the days are kept in the LoadLog so that a score in a later run only re-scores them
+        self.tweet_store.recordLoadCompletion('fused' if fused else 'cleanse', self.days_to_update)
 
-    def calculateSentiment(self):
+    def calculateSentiment(self, days_to_update = None, all_days = False):
         """
         The function that calculates sentiment for the tweets in question.  This 'Delta' vs 'Full' functionality
-        is set by the datesToUpdate field that is specified below.  If no dates are specified then the full run
-        is calculated
+        is set by the days_to_update field that is specified below.  If no days are specified then the days that
+        were cleansed since they were last scored are calculated, which is every day after a full cleanse
+
+        ::param days_to_update(Optional): The days (in the format of the day column) to re-score.  Defaults to the
+                                          days that are waiting to be scored in the LoadLog
+        ::param all_days(Optional): Re-score every day and rebuild the sentiment totals of every group
         """
+        from PythonDataModules.TwitterSentimentAnalyzer import TwitterSentimentAnalyzer
+        self.tweet_store.createTweetTables()
+        if all_days:
+            days_to_update = None
+        elif days_to_update is None:
+            days_to_update = self.tweet_store.returnUnscoredDays()
+            logging.info('-- Scoring %s for %s --' % ('every day' if days_to_update is None else
+                                                      '%i unscored days' % len(days_to_update), self.proj_nm))
         twitter_sentiment = TwitterSentimentAnalyzer(proj_data_dir = self.proj_data_dir
                                                 ,proj_analysis_dir = self.proj_analysis_dir
                                                 ,db_connection = self.connection
-                                                ,days_to_update = self.twitter_cleanser.getDaysToUpdate())
+                                                ,days_to_update = days_to_update)
         twitter_sentiment.calculateSentimentForTweets()
+        self.tweet_store.recordLoadCompletion('score', days_to_update)
+
+    def compactRawData(self, raw_retention_days = 7, archive_retention_months = None):
+        """
+        Merge the daily raw files of every finished month into one archive per group and month, then apply the
+        retention policy to the raw data (see TwitterDataCompactor)
+
+        ::param raw_retention_days(Optional): the days that a daily file is kept after it has been archived.  None
+                                              keeps them
+        ::param archive_retention_months(Optional): the months of archives to keep.  None keeps every archive
+        """
+        from PythonDataModules.TwitterDataCompactor import TwitterDataCompactor
+        twitter_compactor = TwitterDataCompactor(self.proj_data_dir, raw_retention_days, archive_retention_months)
+        twitter_compactor.compactAllGroups()
+
+    def exportSentimentData(self):
+        """
+        Re-write CalculatedSentimentData.csv and RecordCounts.csv from the sentiment already stored in the cleansed
+        database, without re-scoring any tweets.  Only scored tweets are exported, from the sentiment totals of each
+        day (see SentimentAggregates.returnDailyTotalsSQL).  Days that a group has no tweets for are written as 0.
+        """
+        from PythonDataModules.SentimentAggregates import SentimentAggregates
+        daily_sentiment, daily_counts, all_days = {}, {}, []
+        daily_sql = SentimentAggregates(self.connection).returnDailyTotalsSQL(self.tweet_store, self.all_groups)
+        daily_totals = [] if daily_sql is None else self.connection.execute(daily_sql + " ORDER BY 2, 1",
+                                                                            self.all_groups + [0, 99999999])
+        for group, _, day, sentiment_sum, count in daily_totals:
+            if day not in daily_sentiment:
+                all_days.append(day)
+            daily_sentiment.setdefault(day, {})[group] = sentiment_sum / count
+            daily_counts.setdefault(day, {})[group] = count
+
+        for file_name, daily_values in [('CalculatedSentimentData.csv', daily_sentiment), ('RecordCounts.csv', daily_counts)]:
+            with open(self.proj_analysis_dir.joinpath(file_name), 'w', newline = '') as file:
+                writer = csv.writer(file)
+                writer.writerow(['Date'] + self.all_groups)
+                for day in all_days:
+                    writer.writerow([day] + [daily_values[day].get(group, 0) for group in self.all_groups])
+        logging.info('-- Exported %i days of sentiment for %s --' % (len(all_days), self.proj_nm))
+
+    def returnProjectStatus(self):
+        """
+        Summarise the state of each group in the project: the last download, the raw files waiting in the data
+        directory and the tweets that have been cleansed into the database.
+
+        returns - A list of dictionaries, one for each group
+        """
+        qry_file = self.proj_analysis_dir.joinpath('TwitterSearchQueries.json')
+        group_queries = {}
+        if qry_file.exists():
+            with open(qry_file, "r") as file:
+                group_queries = json.load(file)["GroupQueries"]
+
+        group_sql = "SELECT grp, COUNT(*), COUNT(DISTINCT day_key) FROM %s GROUP BY grp" % self.tweet_store.returnTweetSource()
+        group_counts = {row[0]: row[1:] for row in self.connection.execute(group_sql)}
+        status = []
+        for group in self.all_groups:
+            raw_files = [f for f in listdir(self.proj_data_dir.joinpath(group)) if f.endswith('.csv.gz')]
+            archive_dir = self.proj_data_dir.joinpath(group, 'Archive')
+            archives = [f for f in listdir(archive_dir) if f.endswith('.parquet')] if isdir(archive_dir) else []
+            tweets, days = group_counts.get(group, (0, 0))
+            status.append({'group': group,
+                           'last_update': group_queries.get(group, {}).get('LastUpdate', ''),
+                           'max_record': group_queries.get(group, {}).get('MaxRecord', ''),
+                           'raw_files': len(raw_files),
+                           'latest_raw_file': max(raw_files) if raw_files else '',
+                           'archived_months': len(archives),
+                           'cleansed_tweets': tweets,
+                           'cleansed_days': days})
+        return status
 
     def createInitialDirectories():
         prj_data_path = Path(__file__).resolve().parent.joinpath(project_area ,project_name, 'Data')
@@ -121,22 +251,92 @@ class TwitterAnalysisTool(object):
             prj_data_path.joinpath(grp_nm, "CleansedData").mkdir(parents = True)
         return None
 
-def main(project_area, project_name):
+def returnReplyDepth(value):
+    """
+    ::param value: the --reply-depth given on the command line
+    returns - the depth as an integer, which has to be at least 1 for a reply to get the text of its parent
     """
-    The driver function for the TwitterAnalysisTool.  This instantiates an object for each project and goes through
-    and downloads the recent twitter activity, processes and stores the data, and then calculates the sentiment for the data
-    ::param project_area: The project area that is being processed. This corresponds to the folder that will be used
-    ::param project_name: The project name that will be used to drive the Analysis
+    try:
+        reply_depth = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError('%s is not a whole number' % value)
+    if reply_depth < 1:
+        raise argparse.ArgumentTypeError('the reply depth must be at least 1, not %i' % reply_depth)
+    return reply_depth
+
+def main(argv = None):
     """
-    twitter_analysis = TwitterAnalysisTool(project_area=project_area,
-                                            project_name=project_name)
-    twitter_analysis.downloadRecentTwitterActivity()
-    twitter_analysis.processAndStoreData('FULL')
-    twitter_analysis.calculateSentiment()
-    print('Download for %s has completed' % project_name)
+    The driver function for the TwitterAnalysisTool.  This instantiates an object for the project and runs the stage
+    that was asked for.  With no stage the tool downloads the recent twitter activity, processes and stores the data,
+    and then calculates the sentiment for the data.
+    ::param argv(Optional): The command line arguments.  Defaults to sys.argv
+    """
+    parser = argparse.ArgumentParser(description = 'Download, cleanse and score the twitter activity of a project')
+    parser.add_argument('project_area', help = 'The project area folder that is being processed')
+    parser.add_argument('project_name', help = 'The project name that will be used to drive the Analysis')
+    parser.add_argument('--root', default = None, help = 'The folder that holds the project folders')
+    subparsers = parser.add_subparsers(dest = 'stage')
+    subparsers.add_parser('download', help = 'download the recent tweets for every group')
+    cleanse_parser = subparsers.add_parser('cleanse', help = 'cleanse the raw tweets into the database')
+    #a full load deletes and reloads every group, so the load type is never assumed
+    load_type = cleanse_parser.add_mutually_exclusive_group(required = True)
+    load_type.add_argument('--full', dest = 'load_type', action = 'store_const', const = 'FULL',
+                           help = 'delete the tweets of every group and reload them from all of the raw data')
+    load_type.add_argument('--delta', dest = 'load_type', action = 'store_const', const = 'DELTA',
+                           help = "add the tweets of today's raw files")
+    cleanse_parser.add_argument('--fused', action = 'store_true',
+                                help = 'score the tweets while they are cleansed instead of in a separate score stage')
+    cleanse_parser.add_argument('--reply-depth', type = returnReplyDepth, default = 1,
+                                help = 'the number of tweets up the thread of a reply whose text is added to the reply')
+    score_parser = subparsers.add_parser('score', help = 'calculate the sentiment of the cleansed tweets')
+    score_days = score_parser.add_mutually_exclusive_group()
+    score_days.add_argument('--days', nargs = '+', default = None,
+                            help = 'the days to score (e.g. Oct102018).  Defaults to the days cleansed since the last score')
+    score_days.add_argument('--all', dest = 'all_days', action = 'store_true',
+                            help = 'score every day and rebuild the sentiment totals')
+    compact_parser = subparsers.add_parser('compact', help = 'merge the raw files of finished months into archives')
+    compact_parser.add_argument('--raw-retention-days', type = int, default = 7,
+                                help = 'the days that a daily file is kept after it has been archived')
+    compact_parser.add_argument('--keep-raw', dest = 'raw_retention_days', action = 'store_const', const = None,
+                                help = 'keep every daily file after it has been archived')
+    compact_parser.add_argument('--archive-retention-months', type = int, default = None,
+                                help = 'the months of archives to keep.  Defaults to every month')
+    subparsers.add_parser('export', help = 'write the sentiment csv files from the database without re-scoring')
+    subparsers.add_parser('status', help = 'print the state of each group in the project')
+    serve_parser = subparsers.add_parser('serve', help = 'serve read only sentiment queries over http')
+    serve_parser.add_argument('--host', default = '127.0.0.1')
+    serve_parser.add_argument('--port', type = int, default = 8050)
+    args = parser.parse_args(argv)
+
+    twitter_analysis = TwitterAnalysisTool(project_area=args.project_area,
+                                            project_name=args.project_name,
+                                            root_dir=args.root)
+    if args.stage is None:
+        twitter_analysis.downloadRecentTwitterActivity()
+        twitter_analysis.processAndStoreData('FULL')
+        twitter_analysis.calculateSentiment()
+        print('Download for %s has completed' % args.project_name)
+    elif args.stage == 'download':
+        twitter_analysis.downloadRecentTwitterActivity()
+    elif args.stage == 'cleanse':
+        twitter_analysis.processAndStoreData(args.load_type, args.fused, args.reply_depth)
+    elif args.stage == 'score':
+        twitter_analysis.calculateSentiment(args.days, args.all_days)
+    elif args.stage == 'compact':
+        twitter_analysis.compactRawData(args.raw_retention_days, args.archive_retention_months)
+    elif args.stage == 'export':
+        twitter_analysis.exportSentimentData()
+    elif args.stage == 'status':
+        for group_status in twitter_analysis.returnProjectStatus():
+            print(json.dumps(group_status))
+    elif args.stage == 'serve':
+        from PythonDataModules.TwitterSentimentQuery import TwitterSentimentQuery
+        sentiment_query = TwitterSentimentQuery(twitter_analysis.proj_analysis_dir.joinpath('CleansedData.db'))
+        sentiment_query.serveSentimentQueries(args.host, args.port)
 
 
 if __name__ == '__main__':
     #Run the process for the project in question
     #sample statement to run >>python3 TwitterAnalysisTool.py SportsSentiment NFL
-    main(sys.argv[1], sys.argv[2])
+    #or a single stage     >>python3 TwitterAnalysisTool.py SportsSentiment NFL cleanse --delta
+    main()